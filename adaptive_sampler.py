@@ -0,0 +1,178 @@
+import math
+import random
+import threading
+from leaderboard import get_leaderboard
+from metadata_index import get_metadata_index
+from models import MODEL_NAMES
+from ratings_store import STORE_PATH, get_ratings_store, iter_submissions
+
+# Stop favouring a sample once every provider's MOS on it is known to +/- this (95%)
+TARGET_HALF_WIDTH = 0.25
+
+# Variance assumed for a provider on a sample before it has two ratings (1-5 scale)
+PRIOR_VARIANCE = 1.5
+
+# Weight of a sample that has reached the target, so it still comes up now and then
+SETTLED_WEIGHT = 1e-3
+
+# sample_weight() of a sample nobody has rated yet
+UNRATED_WEIGHT = math.sqrt(PRIOR_VARIANCE) + SETTLED_WEIGHT
+
+
+class FenwickTree:
+    """Binary indexed tree over non-negative weights: O(log n) update and weighted draw"""
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = list(weights)
+        self._tree = [0.0] * (self.size + 1)
+        for i, weight in enumerate(self.weights, 1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[i]
+
+    def total(self):
+        total, i = 0.0, self.size
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def set(self, position, weight):
+        delta = weight - self.weights[position]
+        self.weights[position] = weight
+        i = position + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, target):
+        """Position whose cumulative weight range contains target (0 <= target < total)"""
+        position, step = 0, 1 << self.size.bit_length()
+        while step:
+            following = position + step
+            if following <= self.size and self._tree[following] <= target:
+                position = following
+                target -= self._tree[following]
+            step >>= 1
+        # Float drift can land past the last positive weight; step back onto one
+        while position >= self.size or self.weights[position] <= 0:
+            position -= 1
+        return position
+
+
+def sample_weight(leaderboard, sample_id, target=TARGET_HALF_WIDTH):
+    """How much one more rating of sample_id would shrink its widest provider interval.
+
+    Each submission rates all four providers on a sample, so the sample is
+    weighted by its least certain provider. Unrated providers get the prior
+    variance and the largest gain; samples already within target get SETTLED_WEIGHT.
+    """
+    if leaderboard.sample_stats(sample_id) is None:
+        return UNRATED_WEIGHT
+    gain, settled = 0.0, True
+    for model_id in MODEL_NAMES:
+        stats = leaderboard.sample_stats(sample_id, model_id)
+        count = stats["count"] if stats is not None else 0
+        variance = stats["variance"] if count > 1 else PRIOR_VARIANCE
+        if count == 0 or 1.96 * math.sqrt(variance / count) > target:
+            settled = False
+        gain = max(gain, math.sqrt(variance) * (1 / math.sqrt(max(count, 0.25)) - 1 / math.sqrt(count + 1)))
+    return SETTLED_WEIGHT if settled else gain + SETTLED_WEIGHT
+
+
+class AdaptiveSampler:
+    """Weighted draw of metadata entries favouring under-rated and high-disagreement samples.
+
+    Weights live in a Fenwick tree aligned with index.entries, built by
+    catch_up() and then updated as submissions are committed, for only the
+    samples they touch. Samples a
+    rater has already seen are skipped for that rater while unseen ones remain.
+    """
+
+    def __init__(self, index, leaderboard):
+        self.index = index
+        self.leaderboard = leaderboard
+        self._position = {str(entry["id"]): i for i, entry in enumerate(index.entries)}
+        self._tree = FenwickTree([])
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _build_tree(self):
+        return FenwickTree([sample_weight(self.leaderboard, entry["id"]) for entry in self.index.entries])
+
+    def _record(self, submission):
+        rater_id = submission.get("rater_id")
+        sample_ids = submission.get("ratings", {}).keys()
+        if rater_id is not None:
+            self._seen.setdefault(rater_id, set()).update(str(sample_id) for sample_id in sample_ids)
+        return sample_ids
+
+    def catch_up(self, log_path=STORE_PATH):
+        """Reweight every sample and learn which raters have seen which samples from the whole log"""
+        with self._lock:
+            self._tree = self._build_tree()
+            for submission in iter_submissions(log_path):
+                self._record(submission)
+
+    def on_append(self, submissions, end_offset):
+        """RatingsStore listener (after the leaderboard's): reweight the samples just rated"""
+        with self._lock:
+            for submission in submissions:
+                for sample_id in self._record(submission):
+                    position = self._position.get(str(sample_id))
+                    if position is not None:
+                        self._tree.set(position, sample_weight(self.leaderboard, sample_id))
+
+    def sample(self, k, rater_id=None, rng=random):
+        """k distinct entries drawn by weight, avoiding samples rater_id has already rated when possible"""
+        with self._lock:
+            seen = self._seen.get(rater_id, ()) if rater_id is not None else ()
+            removed = []
+            chosen = []
+            try:
+                while len(chosen) < k:
+                    total = self._tree.total()
+                    if total <= 0:
+                        # Only samples this rater has seen are left; let them back in
+                        restore = [(p, w) for p, w in removed if str(self.index.entries[p]["id"]) in seen]
+                        if not restore:
+                            break
+                        for position, weight in restore:
+                            self._tree.set(position, weight)
+                        seen = ()
+                        continue
+                    position = self._tree.find(rng.random() * total)
+                    removed.append((position, self._tree.weights[position]))
+                    self._tree.set(position, 0.0)
+                    entry = self.index.entries[position]
+                    if str(entry["id"]) not in seen:
+                        chosen.append(entry)
+            finally:
+                for position, weight in removed:
+                    self._tree.set(position, weight)
+        return chosen
+
+
+# Process-wide sampler, rebuilt when the metadata index is
+_state = {"sampler": None, "index": None, "log_path": None}
+_lock = threading.Lock()
+
+
+def get_sampler(file_path="new_metadata.json", log_path=STORE_PATH):
+    """Return the shared AdaptiveSampler over file_path, or None if the metadata file does not exist"""
+    index = get_metadata_index(file_path)
+    if index is None:
+        return None
+    with _lock:
+        if _state["index"] is index and _state["log_path"] == log_path:
+            return _state["sampler"]
+        if _state["sampler"] is not None:
+            # Replaced after a metadata change: stop reweighting the old sampler on every submit
+            get_ratings_store(_state["log_path"]).remove_listener(_state["sampler"].on_append)
+        leaderboard = get_leaderboard(log_path=log_path)
+        sampler = AdaptiveSampler(index, leaderboard)
+        get_ratings_store(log_path).add_listener(sampler.on_append, catch_up=lambda: sampler.catch_up(log_path))
+        _state.update({"sampler": sampler, "index": index, "log_path": log_path})
+        return sampler
@@ -0,0 +1,133 @@
+import json
+import argparse
+import numpy as np
+from models import MODEL_NAMES, AUDIO_MODELS
+from ratings_store import default_ratings_path, load_submissions
+
+FIELDS = ("submission", "rater", "sample_id", "audio_key", "model_id", "position", "rating")
+
+
+def flatten(submissions):
+    """Flatten nested submissions into one int array per field.
+
+    audio_key is stored as its number (audio3 -> 3). rater numbers submissions by
+    their rater_id, and a submission without one counts as its own rater.
+    Ratings without a value are dropped.
+    """
+    columns = {field: [] for field in FIELDS}
+    raters = {}
+    submission_col, rater_col, sample_col = columns["submission"], columns["rater"], columns["sample_id"]
+    audio_col, model_col = columns["audio_key"], columns["model_id"]
+    position_col, rating_col = columns["position"], columns["rating"]
+    for n, submission in enumerate(submissions):
+        rater = raters.setdefault(submission.get("rater_id", ("submission", n)), len(raters))
+        for sample_id, sample in submission.get("ratings", {}).items():
+            for audio_key, entry in sample.get("audio_ratings", {}).items():
+                rating = entry.get("rating")
+                if rating is None:
+                    continue
+                submission_col.append(n)
+                rater_col.append(rater)
+                sample_col.append(int(sample_id))
+                audio_col.append(int(audio_key[len("audio"):]))
+                model_col.append(entry.get("actual_model") or AUDIO_MODELS.get(audio_key, 0))
+                position_col.append(entry.get("display_position") or 0)
+                rating_col.append(rating)
+    return {field: np.asarray(values, dtype=np.int64) for field, values in columns.items()}
+
+
+def group_stats(groups, values, minlength=0):
+    """Count, mean and (population) std of values per integer group, via bincount"""
+    counts = np.bincount(groups, minlength=minlength)
+    sums = np.bincount(groups, weights=values, minlength=minlength)
+    squares = np.bincount(groups, weights=values * values, minlength=minlength)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        variances = np.maximum(squares / counts - means * means, 0.0)
+    return counts, means, np.sqrt(variances)
+
+
+def rater_zscores(arrays, raters=None):
+    """Each rating as a z-score within its rater's ratings (a rater with constant ratings scores 0)"""
+    raters = arrays["rater"] if raters is None else raters
+    ratings = arrays["rating"].astype(np.float64)
+    _, means, stds = group_stats(raters, ratings)
+    spread = stds[raters]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(spread > 0, (ratings - means[raters]) / spread, 0.0)
+    return z
+
+
+def model_mos(arrays, z=None):
+    """Per-model MOS, std and 95% CI half-width, plus mean rater z-score when z is given"""
+    models = arrays["model_id"]
+    counts, means, stds = group_stats(models, arrays["rating"].astype(np.float64))
+    if z is not None:
+        _, z_means, _ = group_stats(models, z, minlength=len(counts))
+    result = {}
+    for model_id in np.flatnonzero(counts):
+        count = int(counts[model_id])
+        result[int(model_id)] = {
+            "model_name": MODEL_NAMES.get(int(model_id), "Unknown"),
+            "count": count,
+            "mos": float(means[model_id]),
+            "std": float(stds[model_id]),
+            "ci95": float(1.96 * stds[model_id] / np.sqrt(count)),
+            "z_mos": float(z_means[model_id]) if z is not None else None
+        }
+    return result
+
+
+def position_bias(arrays, z=None):
+    """Mean rating (and mean rater z-score) by display position, relative to the overall mean"""
+    positions = arrays["position"]
+    ratings = arrays["rating"].astype(np.float64)
+    counts, means, _ = group_stats(positions, ratings)
+    if z is not None:
+        _, z_means, _ = group_stats(positions, z, minlength=len(counts))
+    overall = ratings.mean() if len(ratings) else 0.0
+    result = {}
+    for position in np.flatnonzero(counts):
+        result[int(position)] = {
+            "count": int(counts[position]),
+            "mean": float(means[position]),
+            "bias": float(means[position] - overall),
+            "z_mean": float(z_means[position]) if z is not None else None
+        }
+    return result
+
+
+def analyze(arrays):
+    """Per-model MOS (raw and rater-normalized) and per-position bias"""
+    z = rater_zscores(arrays)
+    return {
+        "ratings": int(len(arrays["rating"])),
+        "submissions": int(arrays["submission"].max() + 1) if len(arrays["submission"]) else 0,
+        "models": model_mos(arrays, z),
+        "positions": position_bias(arrays, z)
+    }
+
+
+def print_report(report):
+    print(f"{report['ratings']} ratings from {report['submissions']} submissions\n")
+    print(f"{'model':<16} {'n':>7} {'MOS':>6} {'±95%':>6} {'std':>6} {'z-MOS':>7}")
+    for model in sorted(report["models"].values(), key=lambda m: -m["mos"]):
+        print(f"{model['model_name']:<16} {model['count']:>7} {model['mos']:>6.2f} {model['ci95']:>6.2f} "
+              f"{model['std']:>6.2f} {model['z_mos']:>+7.2f}")
+    print(f"\n{'position':<16} {'n':>7} {'mean':>6} {'bias':>6} {'z':>7}")
+    for position, stats in sorted(report["positions"].items()):
+        print(f"{position:<16} {stats['count']:>7} {stats['mean']:>6.2f} {stats['bias']:>+6.2f} {stats['z_mean']:>+7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compute MOS per TTS model from the collected ratings')
+    parser.add_argument('--ratings-file', type=str, default=default_ratings_path(),
+                        help='Ratings store (.jsonl) or legacy ratings_results.json')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+    report = analyze(flatten(load_submissions(args.ratings_file)))
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
@@ -0,0 +1,162 @@
+import os
+import mmap
+import struct
+import bisect
+import argparse
+import tempfile
+import threading
+from audio_io import set_default_mode
+
+# Layout of an archive file:
+#   header  magic, record count, index offset
+#   data    the MP3 files back to back
+#   index   one fixed-size record per clip, sorted by (sample_id, audio_number)
+MAGIC = b"TTSPACK1"
+HEADER = struct.Struct("<8sQQ")
+RECORD = struct.Struct("<IIQQ")  # sample_id, audio_number, offset, length
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Clip files that can be packed: the generated MP3s, or Opus output of postprocess.py.
+# Each scan takes one extension, so audioK.mp3 and audioK.opus never share a key.
+AUDIO_EXTENSIONS = (".mp3", ".opus")
+
+
+def audio_number(audio_key):
+    """"audio3" -> 3"""
+    return int(audio_key[len("audio"):])
+
+
+def iter_audio_files(base_dir="audios", extension=".mp3"):
+    """Yield (sample_id, audio_number, path) for every audios_N/audioK<extension> under base_dir"""
+    with os.scandir(base_dir) as samples:
+        for sample in samples:
+            if not sample.is_dir() or not sample.name.startswith("audios_"):
+                continue
+            sample_id = sample.name[len("audios_"):]
+            if not sample_id.isdigit():
+                continue
+            with os.scandir(sample.path) as clips:
+                for clip in clips:
+                    stem, ext = os.path.splitext(clip.name)
+                    if ext == extension and stem.startswith("audio") and stem[len("audio"):].isdigit():
+                        yield int(sample_id), audio_number(stem), clip.path
+
+
+def pack_audio(base_dir="audios", archive_path="audios.pack", extension=".mp3"):
+    """Pack every audioK<extension> clip under base_dir into one archive file. Returns the number of clips.
+
+    The archive is written to a temp file and atomically renamed into place, so
+    a running app keeps reading the previous archive until the new one is complete.
+    """
+    directory = os.path.dirname(os.path.abspath(archive_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".audios.", suffix=".pack.part")
+    records = []
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(b"\0" * HEADER.size)
+            offset = HEADER.size
+            for sample_id, number, path in sorted(iter_audio_files(base_dir, extension)):
+                with open(path, "rb") as src:
+                    length = 0
+                    for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                        out.write(chunk)
+                        length += len(chunk)
+                records.append((sample_id, number, offset, length))
+                offset += length
+            index_offset = offset
+            for record in records:
+                out.write(RECORD.pack(*record))
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, len(records), index_offset))
+            out.flush()
+            os.fsync(out.fileno())
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(records)
+
+
+class AudioArchive:
+    """Read-only, memory-mapped view of an archive built by pack_audio().
+
+    Opening maps the file and reads only the header; lookups binary-search the
+    mapped index and return memoryview slices of the mapping, so no clip is
+    copied or read from disk until it is actually used.
+    """
+
+    def __init__(self, path="audios.pack"):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Identifies this build of the archive, e.g. in cache keys
+            self.version = os.fstat(f.fileno()).st_mtime_ns
+        self._view = memoryview(self._mmap)
+        magic, self.count, index_offset = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an audio archive")
+        self._index = self._view[index_offset:index_offset + self.count * RECORD.size]
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, position):
+        return RECORD.unpack_from(self._index, position * RECORD.size)
+
+    def _find(self, sample_id, audio_key):
+        target = (int(sample_id), audio_number(audio_key))
+        position = bisect.bisect_left(range(self.count), target, key=lambda k: self._record(k)[:2])
+        if position < self.count:
+            record = self._record(position)
+            if record[:2] == target:
+                return record
+        return None
+
+    def __contains__(self, key):
+        return self._find(*key) is not None
+
+    def get(self, sample_id, audio_key):
+        """memoryview of the clip's MP3 bytes, or None if the archive does not have it"""
+        record = self._find(sample_id, audio_key)
+        if record is None:
+            return None
+        _, _, offset, length = record
+        return self._view[offset:offset + length]
+
+    def keys(self):
+        """(sample_id, audio_key) of every clip, in index order"""
+        for position in range(self.count):
+            sample_id, number, _, _ = self._record(position)
+            yield str(sample_id), f"audio{number}"
+
+
+# Process-wide archive, reused across Streamlit reruns until the file is replaced
+_archive = {"archive": None, "path": None, "mtime": None}
+_lock = threading.Lock()
+
+
+def open_archive(path="audios.pack"):
+    """Return the shared AudioArchive for path, or None if no archive has been packed"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _lock:
+        if _archive["archive"] is None or _archive["path"] != path or _archive["mtime"] != mtime:
+            # A replaced archive is not closed here: slices handed out earlier may still be alive
+            _archive.update({"archive": AudioArchive(path), "path": path, "mtime": mtime})
+        return _archive["archive"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack the audios/ tree into a single memory-mappable archive')
+    parser.add_argument('--audio-dir', type=str, default='audios', help='Directory holding audios_N/audioK.mp3')
+    parser.add_argument('--archive', type=str, default='audios.pack', help='Archive file to write')
+    parser.add_argument('--extension', type=str, choices=AUDIO_EXTENSIONS, default='.mp3', help='Clip files to pack (.opus for transcoded output)')
+
+    args = parser.parse_args()
+    count = pack_audio(args.audio_dir, args.archive, args.extension)
+    print(f"Packed {count} clips into {args.archive} ({os.path.getsize(args.archive) / 1024 / 1024:.1f} MB)")
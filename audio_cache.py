@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+
+class AudioByteCache:
+    """Thread-safe LRU cache of audio bytes bounded by total size.
+
+    Shared by every Streamlit session in the process, so the 40 players
+    redrawn on each rerun are served from memory once they are hot.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the bytes cached under key, calling loader() to fill a miss"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        # Load outside the lock so one slow read does not stall other sessions
+        data = loader()
+        self.put(key, data)
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = data
+            self.size_bytes += len(data)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+# Process-wide cache, shared by every session
+_cache = None
+_lock = threading.Lock()
+
+
+def get_audio_cache(max_bytes=256 * 1024 * 1024):
+    """Return the shared AudioByteCache, creating it with max_bytes on first use"""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = AudioByteCache(max_bytes)
+        return _cache
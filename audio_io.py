@@ -0,0 +1,97 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _read_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import: os.umask can only be queried by setting it
+UMASK = _read_umask()
+
+
+def set_default_mode(path):
+    """Give a mkstemp file (always 0600) the mode open() would have created it with"""
+    os.chmod(path, 0o666 & ~UMASK)
+
+
+def truncate_torn_tail(path):
+    """Cut an append-only line log back to its last newline, dropping a line torn by a crash.
+
+    Returns the number of bytes removed. Appending onto a torn line would
+    glue the next record to it and make both unreadable.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - CHUNK_SIZE)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        return size - end
+
+
+@contextmanager
+def atomic_output(output_file):
+    """Yield a binary temp file next to output_file and rename it into place on success.
+
+    Readers only ever see the previous file or the complete new one; if the
+    block raises (or the process is killed) output_file is left untouched.
+    """
+    directory = os.path.dirname(output_file) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(output_file)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_chunks(chunks, output_file, on_first_chunk=None):
+    """Atomically write an iterable of byte chunks to output_file. Returns bytes written.
+
+    on_first_chunk, if given, is called when the first non-empty chunk arrives.
+    """
+    written = 0
+    with atomic_output(output_file) as f:
+        for chunk in chunks:
+            if chunk:
+                if written == 0 and on_first_chunk is not None:
+                    on_first_chunk()
+                f.write(chunk)
+                written += len(chunk)
+        if written == 0:
+            # Never replace an existing file with an empty response
+            raise ValueError(f"No audio data received for {output_file}")
+    return written
+
+
+def stream_response_to_file(response, output_file, on_first_chunk=None):
+    """Write a requests Response opened with stream=True to disk chunk by chunk"""
+    return write_chunks(response.iter_content(chunk_size=CHUNK_SIZE), output_file, on_first_chunk)
+
+
+def stream_body_to_file(stream, output_file, on_first_chunk=None):
+    """Write a botocore StreamingBody (or any file-like object) to disk chunk by chunk"""
+    return write_chunks(iter(lambda: stream.read(CHUNK_SIZE), b""), output_file, on_first_chunk)
@@ -0,0 +1,253 @@
+import io
+import os
+import csv
+import shutil
+import hashlib
+import argparse
+import subprocess
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from audio_archive import iter_audio_files
+from audio_io import atomic_output
+from leaderboard import Leaderboard
+from metadata_index import get_metadata_index
+from models import MODEL_NAMES, AUDIO_MODELS
+from mp3_frames import iter_frames
+from ratings_store import default_ratings_path, load_submissions
+
+METRICS_PATH = "audio_metrics.csv"
+PCM_CACHE_DIR = ".pcm_cache"
+
+# Bump when a metric's definition changes, so cached rows are recomputed (from the PCM cache)
+METRICS_VERSION = 1
+
+# 10 ms analysis frames; a frame quieter than SILENCE_DBFS counts as silence
+FRAME_SECONDS = 0.01
+SILENCE_DBFS = -40.0
+
+# A sample at or above this magnitude counts as clipped
+CLIP_LEVEL = 0.999
+
+# Columns computed from the audio, cached across runs
+AUDIO_FIELDS = ("sample_id", "audio_key", "model_id", "model_name", "sample_rate", "duration",
+                "leading_silence", "trailing_silence", "speech_duration", "clipping_ratio",
+                "rms_dbfs", "speech_rms_dbfs", "peak_dbfs", "sha256", "size", "mtime_ns", "metrics_version")
+
+# Columns joined in from new_metadata.json and the ratings on every run
+JOINED_FIELDS = ("text_chars", "chars_per_second", "ratings", "mos", "rating_variance")
+
+NUMERIC_FIELDS = {"model_id": int, "sample_rate": int, "duration": float, "leading_silence": float,
+                  "trailing_silence": float, "speech_duration": float, "clipping_ratio": float,
+                  "rms_dbfs": float, "speech_rms_dbfs": float, "peak_dbfs": float, "size": int,
+                  "mtime_ns": int, "metrics_version": int}
+
+
+def to_dbfs(values):
+    with np.errstate(divide="ignore"):
+        return 20 * np.log10(np.maximum(values, 1e-10))
+
+
+def decode_pcm(ffmpeg, path):
+    """Decode an MP3 to mono float32 PCM at its own sample rate"""
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostats", "-loglevel", "error", "-i", path, "-ac", "1", "-f", "f32le", "-"],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def cached_pcm(ffmpeg, path, digest, cache_dir=PCM_CACHE_DIR):
+    """Memory-mapped PCM of path, decoding it into cache_dir/<sha256[:2]>/<sha256>.npy on first use"""
+    cache_path = os.path.join(cache_dir, digest[:2], f"{digest}.npy")
+    if not os.path.exists(cache_path):
+        pcm = decode_pcm(ffmpeg, path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with atomic_output(cache_path) as f:
+            np.save(f, pcm)
+    return np.load(cache_path, mmap_mode="r")
+
+
+def pcm_metrics(pcm, sample_rate):
+    """Silence at both ends, clipping ratio and RMS / peak level of one clip, all vectorized"""
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    count = len(pcm) // frame
+    duration = len(pcm) / sample_rate
+    if count == 0:
+        return {"duration": duration, "leading_silence": duration, "trailing_silence": 0.0, "speech_duration": 0.0,
+                "clipping_ratio": 0.0, "rms_dbfs": -200.0, "speech_rms_dbfs": -200.0, "peak_dbfs": -200.0}
+
+    squares = np.square(pcm[:count * frame], dtype=np.float64).reshape(count, frame)
+    frame_energy = squares.mean(axis=1)
+    voiced = np.flatnonzero(to_dbfs(np.sqrt(frame_energy)) > SILENCE_DBFS)
+    if len(voiced):
+        first, last = int(voiced[0]), int(voiced[-1]) + 1
+    else:
+        first, last = count, count
+    leading = first * frame / sample_rate
+    trailing = duration - last * frame / sample_rate
+    magnitude = np.abs(pcm)
+    speech_energy = frame_energy[first:last].mean() if last > first else 0.0
+    return {
+        "duration": duration,
+        "leading_silence": leading,
+        "trailing_silence": trailing,
+        "speech_duration": max(duration - leading - trailing, 0.0),
+        "clipping_ratio": float(np.count_nonzero(magnitude >= CLIP_LEVEL) / len(pcm)),
+        "rms_dbfs": float(to_dbfs(np.sqrt(np.mean(np.square(pcm, dtype=np.float64))))),
+        "speech_rms_dbfs": float(to_dbfs(np.sqrt(speech_energy))),
+        "peak_dbfs": float(to_dbfs(magnitude.max()))
+    }
+
+
+def measure_file(job):
+    """Worker: hash one clip and compute its metrics unless previous already holds them for this content.
+
+    Returns an AUDIO_FIELDS row, or an error string.
+    """
+    sample_id, audio_key, path, previous, ffmpeg, cache_dir = job
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if previous is not None and previous["sha256"] == digest and previous["metrics_version"] == METRICS_VERSION:
+            return {**previous, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        header = next(iter_frames(data), None)
+        if header is None:
+            return f"{path}: no MPEG audio frames found"
+        metrics = pcm_metrics(cached_pcm(ffmpeg, path, digest, cache_dir), header.sample_rate)
+    except subprocess.CalledProcessError as e:
+        lines = (e.stderr or b"").decode("utf-8", "replace").strip().splitlines()
+        return f"{path}: {lines[-1] if lines else str(e)}"
+    except (OSError, ValueError) as e:
+        return f"{path}: {str(e)}"
+    model_id = AUDIO_MODELS.get(audio_key, 0)
+    return {
+        "sample_id": sample_id,
+        "audio_key": audio_key,
+        "model_id": model_id,
+        "model_name": MODEL_NAMES.get(model_id, "Unknown"),
+        "sample_rate": header.sample_rate,
+        **{name: round(value, 6) for name, value in metrics.items()},
+        "sha256": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "metrics_version": METRICS_VERSION
+    }
+
+
+def load_metrics(metrics_path=METRICS_PATH):
+    """{(sample_id, audio_key): AUDIO_FIELDS row} from a previous metrics table"""
+    if not os.path.exists(metrics_path):
+        return {}
+    rows = {}
+    with open(metrics_path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                record = {field: row[field] for field in AUDIO_FIELDS}
+                for field, convert in NUMERIC_FIELDS.items():
+                    record[field] = convert(record[field])
+            except (KeyError, ValueError):
+                continue  # written by an older layout: recompute
+            rows[(record["sample_id"], record["audio_key"])] = record
+    return rows
+
+
+def measure_store(base_dir="audios", metrics_path=METRICS_PATH, cache_dir=PCM_CACHE_DIR, workers=None):
+    """Audio metrics of every audios_N/audioK.mp3, reusing rows for unchanged files.
+
+    A file whose size and mtime match its previous row is not read at all; a
+    changed file is hashed and only decoded if its content is new. A file
+    that cannot be measured keeps its previous row, if it has one.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on PATH")
+    previous = load_metrics(metrics_path)
+    rows, jobs = [], []
+    for sample_id, number, path in iter_audio_files(base_dir):
+        key = (str(sample_id), f"audio{number}")
+        row = previous.get(key)
+        stat = os.stat(path)
+        if (row is not None and row["metrics_version"] == METRICS_VERSION
+                and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns):
+            rows.append(row)
+            continue
+        jobs.append((*key, path, row, ffmpeg, cache_dir))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for job, result in zip(jobs, executor.map(measure_file, jobs, chunksize=8)):
+                if isinstance(result, str):
+                    print(f"Could not measure {result}")
+                    result = job[3]
+                if result is not None:
+                    rows.append(result)
+    return rows
+
+
+def join_rows(rows, metadata_path="new_metadata.json", ratings_file=None):
+    """Add text length, speaking rate and the (sample, provider) rating stats to each row"""
+    index = get_metadata_index(metadata_path)
+    leaderboard = Leaderboard()
+    if ratings_file and os.path.exists(ratings_file):
+        for submission in load_submissions(ratings_file):
+            leaderboard.apply(submission)
+    joined = []
+    for row in rows:
+        record = index.get(row["sample_id"]) if index is not None else None
+        chars = len(record["text"]) if record is not None else None
+        stats = leaderboard.sample_stats(row["sample_id"], row["model_id"])
+        joined.append({
+            **row,
+            "text_chars": chars,
+            "chars_per_second": round(chars / row["speech_duration"], 3) if chars and row["speech_duration"] else None,
+            "ratings": stats["count"] if stats is not None else 0,
+            "mos": round(stats["mos"], 4) if stats is not None else None,
+            "rating_variance": round(stats["variance"], 4) if stats is not None else None
+        })
+    return joined
+
+
+def write_metrics(rows, metrics_path=METRICS_PATH):
+    """Atomically write the joined table as CSV, sorted by sample and audio key"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=AUDIO_FIELDS + JOINED_FIELDS)
+    writer.writeheader()
+    writer.writerows(sorted(rows, key=lambda row: (int(row["sample_id"]), row["audio_key"])))
+    with atomic_output(metrics_path) as f:
+        f.write(buffer.getvalue().encode("utf-8"))
+
+
+def print_summary(rows):
+    print(f"{len(rows)} clips\n")
+    print(f"{'model':<16} {'lead s':>7} {'trail s':>7} {'clip %':>7} {'RMS dB':>7} {'chars/s':>8} {'MOS':>6}")
+    for model_id, model_name in sorted(MODEL_NAMES.items()):
+        model_rows = [row for row in rows if row["model_id"] == model_id]
+        if not model_rows:
+            continue
+        column = lambda name: np.array([row[name] for row in model_rows if row[name] is not None], dtype=np.float64)
+        mean = lambda values: f"{values.mean():.2f}" if len(values) else "-"
+        print(f"{model_name:<16} {mean(column('leading_silence')):>7} {mean(column('trailing_silence')):>7} "
+              f"{mean(column('clipping_ratio') * 100):>7} {mean(column('speech_rms_dbfs')):>7} "
+              f"{mean(column('chars_per_second')):>8} {mean(column('mos')):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compute objective audio metrics per clip and join them with the text and ratings')
+    parser.add_argument('--audio-dir', type=str, default='audios', help='Directory holding audios_N/audioK.mp3')
+    parser.add_argument('--output', type=str, default=METRICS_PATH, help='CSV table to write')
+    parser.add_argument('--pcm-cache', type=str, default=PCM_CACHE_DIR, help='Directory of decoded float32 .npy files')
+    parser.add_argument('--metadata', type=str, default='new_metadata.json', help='Metadata file with the sample texts')
+    parser.add_argument('--ratings-file', type=str, default=default_ratings_path(),
+                        help='Ratings store (.jsonl) or legacy ratings_results.json')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+
+    args = parser.parse_args()
+    try:
+        rows = measure_store(args.audio_dir, args.output, args.pcm_cache, args.workers)
+    except RuntimeError as e:
+        parser.error(str(e))
+    rows = join_rows(rows, args.metadata, args.ratings_file)
+    write_metrics(rows, args.output)
+    print_summary(rows)
@@ -2,17 +2,18 @@ import boto3
 import os
 from botocore.exceptions import BotoCoreError, ClientError
 from contextlib import closing
-import html
 from typing import Dict, Optional
+from tts_clients import get_polly_client
+from ssml import build_polly_ssml
 
 class PollyTTS:
     def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, region_name: str = 'us-east-1'):
-        """Initialize Polly client with AWS credentials."""
-        self.polly_client = boto3.Session(
+        """Initialize Polly client with AWS credentials (shared across instances)."""
+        self.polly_client = get_polly_client(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             region_name=region_name
-        ).client('polly')
+        )
 
     def text_to_ssml(self, text: str, language: str = "en-US") -> str:
         """
@@ -22,18 +23,7 @@ class PollyTTS:
             text (str): Input text
             language (str): Language code (e.g., "en-US", "hi-IN")
         """
-        # Escape special characters
-        escaped_text = html.escape(text)
-        
-        # Basic SSML template with language support
-        ssml = f"""
-        <speak>
-            <lang xml:lang="{language}">
-                {escaped_text}
-            </lang>
-        </speak>
-        """
-        return ssml.strip()
+        return build_polly_ssml(text, language)
 
     def generate_speech(
         self,
@@ -56,15 +46,8 @@ class PollyTTS:
             speech_rate (str): Speech rate (slow, medium, fast)
         """
         try:
-            # Convert text to SSML
-            ssml_text = self.text_to_ssml(text, language)
-
-            # Add speech rate control to SSML if needed
-            if speech_rate != "medium":
-                ssml_text = ssml_text.replace("<speak>", 
-                    f'<speak><prosody rate="{speech_rate}">')
-                ssml_text = ssml_text.replace("</speak>", 
-                    "</prosody></speak>")
+            # Convert text to SSML, with speech rate control if needed
+            ssml_text = build_polly_ssml(text, language, speech_rate)
 
             # Request speech synthesis
             response = self.polly_client.synthesize_speech(
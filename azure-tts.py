@@ -50,9 +50,10 @@
 #     text_to_speech(token, region, text, output_file)
 
 
-import requests
 import os
 from dotenv import load_dotenv
+from tts_clients import get_http_session, get_azure_token_cache
+from ssml import build_azure_ssml, tag_languages
 
 load_dotenv()
 
@@ -60,17 +61,9 @@ load_dotenv()
 subscription_key = os.getenv("AZURE_SPEECH_KEY")
 region = "eastus2"  # e.g., "eastus", "westeurope"
 
-# Step 1: Get an access token
+# Step 1: Get an access token (cached for its validity window and refreshed before expiry)
 def get_access_token(subscription_key, region):
-    fetch_token_url = f"https://{region}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
-    headers = {
-        'Ocp-Apim-Subscription-Key': subscription_key,
-        'Content-type': 'application/x-www-form-urlencoded',
-        'Content-Length': '0'
-    }
-    response = requests.post(fetch_token_url, headers=headers)
-    response.raise_for_status()
-    return response.text
+    return get_azure_token_cache(subscription_key, region).get_token()
 
 # Step 2: Convert text to speech
 def text_to_speech(access_token, region, text, output_file):
@@ -84,15 +77,15 @@ def text_to_speech(access_token, region, text, output_file):
     
     # We'll use an Indian voice that can handle both English and Hindi
     # Using explicit voice selection with mstts:express-as style
-    ssml = f"""
-    <speak version='1.0' xmlns="http://www.w3.org/2001/10/synthesis" xmlns:mstts="https://www.w3.org/2001/mstts" xml:lang='en-IN'>
-        <voice name='hi-IN-SwaraNeural'>
-            {process_mixed_text(text)}
-        </voice>
-    </speak>
-    """
+    ssml = build_azure_ssml(text, 'hi-IN-SwaraNeural', 'en-IN', 'hi-IN')
     
-    response = requests.post(tts_url, headers=headers, data=ssml.encode('utf-8'))
+    session = get_http_session("azure")
+    response = session.post(tts_url, headers=headers, data=ssml.encode('utf-8'))
+    if response.status_code == 401:
+        # Token rejected: force a single refresh and retry
+        access_token = get_azure_token_cache(subscription_key, region).force_refresh(access_token)
+        headers['Authorization'] = f'Bearer {access_token}'
+        response = session.post(tts_url, headers=headers, data=ssml.encode('utf-8'))
     
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
@@ -106,27 +99,9 @@ def text_to_speech(access_token, region, text, output_file):
 def process_mixed_text(text):
     """
     Process mixed text to properly tag Hindi/Devanagari portions with the correct language.
-    This is a simple implementation that assumes Devanagari characters can be detected.
+    The text is escaped for SSML and split into language runs in a single pass.
     """
-    import re
-    
-    # More robust way of detecting Devanagari text blocks
-    # This regex will match continuous blocks of Devanagari script
-    devanagari_pattern = re.compile(r'[\u0900-\u097F\u0981-\u09FF]+')
-    
-    # Start with the text as is
-    processed_text = text
-    
-    # Find all Devanagari segments and replace them with properly tagged versions
-    for match in devanagari_pattern.finditer(text):
-        devanagari_text = match.group(0)
-        # Create properly tagged version for Hindi
-        tagged_text = f'<lang xml:lang="hi-IN">{devanagari_text}</lang>'
-        # Replace in the original text
-        # We need to escape the Devanagari text for regex replacement
-        processed_text = processed_text.replace(devanagari_text, tagged_text)
-    
-    return processed_text
+    return tag_languages(text, "hi-IN")
 
 if __name__ == "__main__":
     text = "Hello नमस्ते, this is a mixed message! at 5:30pm"
@@ -138,13 +113,7 @@ if __name__ == "__main__":
         
         # Print the SSML for debugging purposes
         print("\nGenerated SSML for debugging:")
-        ssml = f"""
-        <speak version='1.0' xmlns="http://www.w3.org/2001/10/synthesis" xmlns:mstts="https://www.w3.org/2001/mstts" xml:lang='en-IN'>
-            <voice name='hi-IN-SwaraNeural'>
-                {process_mixed_text(text)}
-            </voice>
-        </speak>
-        """
+        ssml = build_azure_ssml(text, 'hi-IN-SwaraNeural', 'en-IN', 'hi-IN')
         print(ssml)
     except Exception as e:
         print(f"An error occurred: {e}")
\ No newline at end of file
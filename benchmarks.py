@@ -0,0 +1,314 @@
+"""Offline microbenchmarks for the project's local hot paths.
+
+Every case runs against synthetic data generated in a temp directory, so no
+network access or credentials are needed. Results (median wall time and peak
+traced memory) can be saved as a baseline and compared on later runs:
+
+    python benchmarks.py --save-baseline bench_baseline.json
+    python benchmarks.py --compare bench_baseline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import itertools
+import importlib.util
+import statistics
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from models import MODEL_NAMES, AUDIO_MODELS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENGLISH_WORDS = (
+    "after completing her MBA at Stanford Kavya accepted a data strategist role with Microsoft "
+    "last July the meeting moved from 9:30 AM to 08:00 because the CEO has a 13:00 investor call "
+    "survey results showed that 71.6% of employees preferred hybrid work"
+).split()
+HINDI_WORDS = "हैदराबाद न्यूयॉर्क काठमांडू ऑस्ट्रेलिया पेरिस नमस्ते कल शाम को समय पर पहुँचोगे".split()
+
+CORPUS_SIZES = [1_000, 10_000, 100_000]
+PASSAGE_SIZES = [10, 100, 1_000]
+RATINGS_SIZES = [10_000]
+FULL_CORPUS_SIZES = CORPUS_SIZES + [1_000_000]
+FULL_RATINGS_SIZES = RATINGS_SIZES + [100_000, 1_000_000]
+
+
+def load_script(filename, module_name):
+    """Import one of the repo's scripts by path (several have dashes in their names)"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# Synthetic data
+
+def synthetic_lines(count, seed=0):
+    """Code-mixed English/Devanagari sentences shaped like text.txt"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(HINDI_WORDS) if rng.random() < 0.15 else rng.choice(ENGLISH_WORDS)
+                 for _ in range(rng.randint(10, 22))]
+        lines.append(" ".join(words) + ".")
+    return lines
+
+
+def synthetic_metadata(count, seed=0):
+    """Entries shaped like new_metadata.json"""
+    rng = random.Random(seed)
+    metadata = []
+    for idx, text in enumerate(synthetic_lines(count, seed), 1):
+        positions = [1, 2, 3, 4]
+        rng.shuffle(positions)
+        metadata.append({
+            "id": str(idx),
+            "text": text,
+            f"audios_{idx}": {f"audio{k}": positions[k - 1] for k in range(1, 5)}
+        })
+    return metadata
+
+
+def synthetic_submissions(count, num_samples=1_000, seed=0):
+    """Yield submissions shaped like ratings_results.json (10 samples x 4 ratings each), one at a time"""
+    rng = random.Random(seed)
+    texts = synthetic_lines(min(num_samples, 1_000), seed)
+    start = datetime(2025, 4, 23, 17, 0, 0)
+    for n in range(count):
+        ratings = {}
+        for sample_id in rng.sample(range(1, num_samples + 1), 10):
+            audio_keys = list(AUDIO_MODELS)
+            rng.shuffle(audio_keys)
+            ratings[str(sample_id)] = {
+                "text": texts[sample_id % len(texts)],
+                "audio_ratings": {
+                    audio_key: {
+                        "display_position": position,
+                        "actual_model": AUDIO_MODELS[audio_key],
+                        "model_name": MODEL_NAMES[AUDIO_MODELS[audio_key]],
+                        "rating": rng.randint(1, 5)
+                    }
+                    for position, audio_key in enumerate(audio_keys, 1)
+                }
+            }
+        yield {
+            "timestamp": (start + timedelta(seconds=n)).strftime("%Y-%m-%d %H:%M:%S"),
+            "ratings": ratings
+        }
+
+
+def write_ratings_log(path, count, seed=0):
+    """Stream synthetic submissions into a JSONL ratings log, never holding more than one in memory"""
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            for submission in synthetic_submissions(count, seed=seed):
+                f.write(json.dumps(submission, ensure_ascii=False) + "\n")
+    return path
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    return path
+
+
+# Benchmark cases: each setup(size, workdir) returns a zero-argument callable
+
+def setup_process_mixed_text_lines(size, workdir):
+    azure_tts = load_script("azure-tts.py", "azure_tts")
+    lines = synthetic_lines(size)
+    return lambda: [azure_tts.process_mixed_text(line) for line in lines]
+
+
+def setup_process_mixed_text_passage(size, workdir):
+    azure_tts = load_script("azure-tts.py", "azure_tts")
+    passage = " ".join(synthetic_lines(size))
+    return lambda: azure_tts.process_mixed_text(passage)
+
+
+def setup_text_to_ssml(size, workdir):
+    aws_tts = load_script("aws-tts.py", "aws_tts")
+    # text_to_ssml needs no client; skip __init__ so no AWS session is created
+    polly = aws_tts.PollyTTS.__new__(aws_tts.PollyTTS)
+    lines = synthetic_lines(size)
+    return lambda: [polly.text_to_ssml(line, "en-IN") for line in lines]
+
+
+def setup_ssml_batch(size, workdir):
+    ssml = load_script("ssml.py", "ssml")
+    lines = synthetic_lines(size)
+    return lambda: ssml.build_azure_ssml_batch(lines, "hi-IN-SwaraNeural")
+
+
+def setup_create_metadata(size, workdir):
+    metadata_creator = load_script("metadata_creator.py", "metadata_creator")
+    with open(os.path.join(workdir, "text.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(synthetic_lines(size)))
+
+    def run():
+        with working_directory(workdir):
+            return metadata_creator.create_metadata()
+    return run
+
+
+def setup_load_metadata(size, workdir):
+    final = load_script("final.py", "final")
+    path = write_json(os.path.join(workdir, f"metadata_{size}.json"), synthetic_metadata(size))
+
+    def run():
+        # The sampler's ratings log is cwd-relative; keep it inside workdir
+        with working_directory(workdir):
+            return final.load_metadata(path, num_samples=10)
+    # Build the index and sampler up front so only the cached hit is timed
+    run()
+    return run
+
+
+def setup_load_metadata_cold(size, workdir):
+    final = load_script("final.py", "final")
+    paths = [write_json(os.path.join(workdir, f"metadata_{size}_{seed}.json"), synthetic_metadata(size, seed))
+             for seed in (1, 2)]
+    calls = itertools.count()
+
+    def run():
+        # Only one metadata file is cached, so alternating files re-parses, re-indexes and rebuilds the sampler
+        with working_directory(workdir):
+            return final.load_metadata(paths[next(calls) % 2], num_samples=10)
+    return run
+
+
+def setup_save_ratings(size, workdir):
+    final = load_script("final.py", "final")
+    ratings_store = load_script("ratings_store.py", "ratings_store")
+    # save_ratings appends, so this log is not shared with the read-only cases
+    path = write_ratings_log(os.path.join(workdir, f"ratings_{size}.jsonl"), size)
+    ratings = next(synthetic_submissions(1, seed=1))["ratings"]
+    return lambda: final.save_ratings(ratings, path)
+
+
+def setup_analyze(size, workdir):
+    analysis = load_script("analysis.py", "analysis")
+    ratings_store = load_script("ratings_store.py", "ratings_store")
+    path = write_ratings_log(os.path.join(workdir, f"submissions_{size}.jsonl"), size)
+    arrays = analysis.flatten(ratings_store.iter_submissions(path))
+    return lambda: analysis.analyze(arrays)
+
+
+def setup_bootstrap(size, workdir):
+    analysis = load_script("analysis.py", "analysis")
+    mos_stats = load_script("mos_stats.py", "mos_stats")
+    ratings_store = load_script("ratings_store.py", "ratings_store")
+    path = write_ratings_log(os.path.join(workdir, f"submissions_{size}.jsonl"), size)
+    arrays = analysis.flatten(ratings_store.iter_submissions(path))
+    return lambda: mos_stats.compare_models(arrays, "sample", replicates=1_000, seed=0)
+
+
+BENCHMARKS = {
+    "process_mixed_text[lines]": (setup_process_mixed_text_lines, "corpus"),
+    "process_mixed_text[passage]": (setup_process_mixed_text_passage, "passage"),
+    "PollyTTS.text_to_ssml": (setup_text_to_ssml, "corpus"),
+    "build_azure_ssml_batch": (setup_ssml_batch, "corpus"),
+    "create_metadata": (setup_create_metadata, "corpus"),
+    "load_metadata": (setup_load_metadata, "corpus"),
+    "load_metadata[cold]": (setup_load_metadata_cold, "corpus"),
+    "save_ratings": (setup_save_ratings, "ratings"),
+    "analysis.analyze": (setup_analyze, "ratings"),
+    "mos_stats.compare_models": (setup_bootstrap, "ratings"),
+}
+
+
+def measure(func, repeat):
+    """Median wall time over `repeat` runs, plus peak traced memory of one extra run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def run_benchmarks(names=None, sizes=None, repeat=3):
+    """Run the selected benchmarks and return {"name[size]": {"seconds", "peak_bytes"}}"""
+    sizes = sizes or {"corpus": CORPUS_SIZES, "passage": PASSAGE_SIZES, "ratings": RATINGS_SIZES}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (setup, size_kind) in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            for size in sizes[size_kind]:
+                func = setup(size, workdir)
+                seconds, peak = measure(func, repeat)
+                key = f"{name}[{size}]"
+                results[key] = {"seconds": seconds, "peak_bytes": peak}
+                print(f"{key:<45} {seconds * 1000:>10.2f} ms {peak / 1024 / 1024:>10.2f} MB")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the ratio to the baseline for each case. Returns the keys that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<45} {'time':>8} {'memory':>8}")
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            print(f"{key:<45} {'new':>8} {'new':>8}")
+            continue
+        time_ratio = current["seconds"] / previous["seconds"] if previous["seconds"] else 1.0
+        memory_ratio = current["peak_bytes"] / previous["peak_bytes"] if previous["peak_bytes"] else 1.0
+        flag = ""
+        if time_ratio > threshold or memory_ratio > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<45} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run offline microbenchmarks for the local hot paths')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), help='Benchmarks to run (default: all)')
+    parser.add_argument('--full', action='store_true', help='Include the 1M-line corpus and 100k/1M-submission ratings sizes')
+    parser.add_argument('--quick', action='store_true', help='Only run the smallest size of each benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (the median is reported)')
+    parser.add_argument('--save-baseline', type=str, help='Write results to this JSON file')
+    parser.add_argument('--compare', type=str, help='Compare results against a saved baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown / memory ratio reported as a regression')
+
+    args = parser.parse_args()
+    if args.quick:
+        sizes = {"corpus": CORPUS_SIZES[:1], "passage": PASSAGE_SIZES[:1], "ratings": RATINGS_SIZES[:1]}
+    elif args.full:
+        sizes = {"corpus": FULL_CORPUS_SIZES, "passage": PASSAGE_SIZES, "ratings": FULL_RATINGS_SIZES}
+    else:
+        sizes = None
+
+    results = run_benchmarks(args.only, sizes, args.repeat)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
@@ -4,11 +4,16 @@ import pandas as pd
 import time
 import os
 import json
-import requests
+from tts_clients import get_http_session
 
 from dotenv import load_dotenv
 load_dotenv()
 import csv
+
+# Every rated clip was generated with this voice (Riya Rao - Hindi Customer Care);
+# look up alternatives with `python voice_catalog.py --language hindi`
+VOICE_ID = "mfMM3ijQgz8QtMeKifko"
+
 def generate_speech(api_key, text, language, output_file):
     """
     Generate speech using ElevenLabs API for a given language.
@@ -28,27 +33,9 @@ def generate_speech(api_key, text, language, output_file):
         "xi-api-key": api_key
     }
 
-    # Fetch voices list
-    response = requests.get(f"{base_url}/voices", headers=headers)
-    voices = response.json().get('voices', [])
-    # with open("voices.json", "w") as f:
-    #     json.dump(voices, f)
-    # print(voices)
-    # Find a voice matching the specified language
-    selected_voice = None
-    if language.lower() == "english":
-        # Select the first available English voice
-        selected_voice = voices[0]["voice_id"] if voices else None
-    else:
-        # Try to match language in voice name
-        for voice in voices:
-            if language.lower() in voice.get("name", "").lower():
-                selected_voice = voice["voice_id"]
-                break
-    # selected_voice = "90ipbRoKi4CpHXvKVtl0"    
-    selected_voice = "mfMM3ijQgz8QtMeKifko"            
-    if not selected_voice:
-        return {"status": "error", "message": f"No voice found for language: {language}"}
+    session = get_http_session("elevenlabs")
+
+    selected_voice = VOICE_ID
 
     # Prepare the payload
     payload = {
@@ -61,7 +48,7 @@ def generate_speech(api_key, text, language, output_file):
     }
 
     # Make API request
-    tts_response = requests.post(
+    tts_response = session.post(
         f"{base_url}/text-to-speech/{selected_voice}",
         json=payload,
         headers=headers
@@ -1,8 +1,13 @@
 import streamlit as st
-import json
 import os
-import random
+import uuid
 from datetime import datetime
+from audio_archive import open_archive
+from audio_cache import get_audio_cache
+from ratings_store import get_ratings_store
+from leaderboard import get_leaderboard
+from adaptive_sampler import get_sampler
+from models import MODEL_NAMES
 
 # Set page configuration
 st.set_page_config(page_title="TTS Model Rating System", layout="wide")
@@ -35,29 +40,19 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Function to load metadata and select random samples
-def load_metadata(file_path="new_metadata.json", num_samples=10):
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            all_data = json.load(f)
-            # Select random samples if we have more than requested
-            if len(all_data) > num_samples:
-                return random.sample(all_data, num_samples)
-            return all_data
+# Function to load metadata and select samples
+def load_metadata(file_path="new_metadata.json", num_samples=10, rater_id=None):
+    # Parsed once per process and re-parsed only when the file changes
+    sampler = get_sampler(file_path)
+    if sampler is not None:
+        # Favour samples with few ratings or high disagreement that this rater has not seen
+        return sampler.sample(num_samples, rater_id)
     else:
         st.error(f"Metadata file not found at {file_path}")
         return []
 
-# Model name mapping for reference (not shown to users during testing)
-MODEL_NAMES = {
-    1: "AWS Polly",
-    2: "Google TTS",
-    3: "ElevenLabs TTS",
-    4: "Azure TTS"
-}
-
 # Function to save results
-def save_ratings(ratings, file_path="ratings_results.json"):
+def save_ratings(ratings, file_path="ratings_results.jsonl", rater_id=None):
     # Create a timestamp for this submission
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -66,22 +61,45 @@ def save_ratings(ratings, file_path="ratings_results.json"):
         "timestamp": timestamp,
         "ratings": ratings
     }
+    if rater_id is not None:
+        submission["rater_id"] = rater_id
     
-    # Load existing results if any
-    all_results = []
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            all_results = json.load(f)
-    
-    # Add new submission
-    all_results.append(submission)
+    # Keep the leaderboard aggregates subscribed to the store
+    get_leaderboard(log_path=file_path)
     
-    # Save back to file
-    with open(file_path, "w") as f:
-        json.dump(all_results, f, indent=4, ensure_ascii=False)
+    # Append to the store (created from ratings_results.json on first use); returns once
+    # the group commit holding this submission has been fsynced
+    get_ratings_store(file_path).submit(submission)
     
     return True
 
+# Packed audio store built by audio_archive.py; the audios/ tree is used when it is missing
+AUDIO_ARCHIVE = "audios.pack"
+
+# Memory budget of the audio bytes cache shared by all sessions
+AUDIO_CACHE_MB = int(os.getenv("AUDIO_CACHE_MB", "256"))
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def audio_format(data):
+    """MIME type for st.audio: Ogg Opus from postprocess.py, otherwise MP3"""
+    return "audio/ogg" if data[:4] == b"OggS" else "audio/mpeg"
+
+# Function to get the audio for one player
+def get_audio(sample_id, audio_key, archive_path=AUDIO_ARCHIVE):
+    """Audio bytes of one clip, from the in-memory cache when hot, else from the archive or audios/ tree"""
+    cache = get_audio_cache(AUDIO_CACHE_MB * 1024 * 1024)
+    archive = open_archive(archive_path)
+    if archive is not None and (sample_id, audio_key) in archive:
+        # st.audio takes bytes, not memoryviews: copy the clip out of the mapping once
+        key = (archive.path, archive.version, sample_id, audio_key)
+        return cache.get(key, lambda: archive.get(sample_id, audio_key).tobytes())
+    audio_path = f"./audios/audios_{sample_id}/{audio_key}.mp3"
+    key = (audio_path, os.stat(audio_path).st_mtime_ns)
+    return cache.get(key, lambda: read_file(audio_path))
+
 # Function to handle rating changes
 def update_rating(sample_id, audio_key, model_id, position):
     key = f"{sample_id}_{audio_key}"
@@ -112,9 +130,18 @@ def main():
     The audios are randomized and anonymized - you won't know which TTS model produced which audio.
     """)
     
-    # Load 10 random samples from metadata
+    # Anonymous rater id kept in the page URL (?rater=...), so a rater coming back
+    # through the same link, or asking for more samples, is not shown one twice
+    if 'rater_id' not in st.session_state:
+        rater_id = st.query_params.get("rater")
+        if not rater_id:
+            rater_id = uuid.uuid4().hex
+            st.query_params["rater"] = rater_id
+        st.session_state.rater_id = rater_id
+    
+    # Load 10 samples from metadata
     if 'samples' not in st.session_state or st.session_state.get('reload_samples', False):
-        st.session_state.samples = load_metadata(num_samples=10)
+        st.session_state.samples = load_metadata(num_samples=10, rater_id=st.session_state.rater_id)
         st.session_state.reload_samples = False
     
     samples = st.session_state.samples
@@ -141,16 +168,11 @@ def main():
         sample_id = str(item["id"])  # Convert to string for consistency
         text = item["text"]
         
-        # Get the correct audio mapping key (audios_1, audios_2, etc.)
-        audio_key = f"audios_{sample_id}"
-        if audio_key not in item:
-            # Try alternate format if the key doesn't exist
-            audio_key = f"audios_{int(sample_id)}"
-            if audio_key not in item:
-                st.warning(f"Could not find audio mapping for sample {sample_id}")
-                continue
-        
-        audio_mapping = item[audio_key]
+        # Audio mapping (audios_1, audios_2, etc.) resolved when the metadata was indexed
+        audio_mapping = item.get("audio_mapping")
+        if audio_mapping is None:
+            st.warning(f"Could not find audio mapping for sample {sample_id}")
+            continue
         
         # Store text in session state ratings
         if sample_id in st.session_state.ratings:
@@ -178,7 +200,8 @@ def main():
                 
                 # Display actual audio player
                 try:
-                    st.audio(audio_path)
+                    audio = get_audio(sample_id, audio_key)
+                    st.audio(audio, format=audio_format(audio))
                 except Exception as e:
                     st.error(f"Could not load audio: {e}")
                     st.markdown(f"*Audio would be at: {audio_path}*")
@@ -221,12 +244,21 @@ def main():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Submit Ratings", type="primary", use_container_width=True):
-            if save_ratings(st.session_state.ratings):
+            if save_ratings(st.session_state.ratings, rater_id=st.session_state.rater_id):
                 st.session_state.submitted = True
                 st.success("Your ratings have been submitted successfully!")
             else:
                 st.error("There was an error saving your ratings.")
     
+    # Once submitted, offer another set of samples this rater has not rated yet
+    if st.session_state.submitted:
+        with col2:
+            if st.button("Rate more samples", use_container_width=True):
+                st.session_state.reload_samples = True
+                del st.session_state.ratings
+                st.session_state.submitted = False
+                st.rerun()
+    
     # with col2:
     #     # Show current ratings in JSON format (for debugging)
     #     if st.button("Show Results Summary", use_container_width=True):
@@ -262,14 +294,6 @@ def main():
     # if st.checkbox("Show raw ratings data (JSON)"):
     #     st.json(st.session_state.ratings)
     
-    # If ratings were submitted, show a reset button
-    # if st.session_state.submitted:
-    #     if st.button("Rate more samples", use_container_width=True):
-    #         # Flag to reload samples on next run
-    #         st.session_state.reload_samples = True
-    #         st.session_state.ratings = {}
-    #         st.session_state.submitted = False
-    #         st.experimental_rerun()
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,17 @@
 
 from google.cloud import texttospeech
-import os
 import pandas as pd
 import time
 import csv
+from tts_clients import get_google_client
 
 def synthesize_speech(text, output_filename, credentials_path):
     """Synthesizes speech from the input string of text and returns the time taken."""
     # Start timing
     start_time = time.time()
     
-    # Set the GOOGLE_APPLICATION_CREDENTIALS environment variable
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-    
-    # Initialize the client
-    client = texttospeech.TextToSpeechClient()
+    # Reuse the process-wide client (sets GOOGLE_APPLICATION_CREDENTIALS on first use)
+    client = get_google_client(credentials_path)
     
     # Set the text input to be synthesized
     input_text = texttospeech.SynthesisInput(text=text)
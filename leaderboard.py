@@ -0,0 +1,228 @@
+import os
+import json
+import argparse
+import tempfile
+import threading
+from audio_io import set_default_mode
+from ratings_store import STORE_PATH, LEGACY_PATH, get_ratings_store, import_json
+from models import MODEL_NAMES, AUDIO_MODELS
+
+SNAPSHOT_PATH = "ratings_results.leaderboard.json"
+
+# Persist the snapshot after this many new submissions; anything newer is
+# replayed from the ratings log on the next load
+SNAPSHOT_EVERY = 100
+
+
+def add_rating(aggregates, key, rating):
+    """Fold one rating into the [count, sum, sum of squares] stored under key"""
+    entry = aggregates.get(key)
+    if entry is None:
+        aggregates[key] = [1, rating, rating * rating]
+    else:
+        entry[0] += 1
+        entry[1] += rating
+        entry[2] += rating * rating
+
+
+def describe(entry):
+    """Count, mean and sample variance of a [count, sum, sum of squares] aggregate"""
+    count, total, squares = entry
+    mean = total / count
+    variance = (squares - count * mean * mean) / (count - 1) if count > 1 else 0.0
+    return {"count": count, "mos": mean, "variance": max(variance, 0.0)}
+
+
+class Leaderboard:
+    """Running count / sum / sum-of-squares of ratings per model, per sample and per (sample, model).
+
+    Applying a submission touches only the aggregates of the ratings it holds,
+    so keeping the leaderboard live costs O(1) per submit. offset is the byte
+    position in the ratings log up to which submissions have been applied.
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.samples = {}
+        self.sample_models = {}
+        self.submissions = 0
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def apply(self, submission):
+        with self._lock:
+            self._apply(submission)
+
+    def _apply(self, submission):
+        for sample_id, sample in submission.get("ratings", {}).items():
+            for audio_key, entry in sample.get("audio_ratings", {}).items():
+                rating = entry.get("rating")
+                if rating is None:
+                    continue
+                model_id = entry.get("actual_model") or AUDIO_MODELS.get(audio_key)
+                add_rating(self.models, str(model_id), rating)
+                add_rating(self.samples, str(sample_id), rating)
+                add_rating(self.sample_models, f"{sample_id}:{model_id}", rating)
+        self.submissions += 1
+
+    def on_append(self, submissions, end_offset):
+        """RatingsStore listener: apply freshly committed submissions"""
+        with self._lock:
+            for submission in submissions:
+                self._apply(submission)
+            self.offset = end_offset
+
+    def catch_up(self, log_path=STORE_PATH):
+        """Apply every complete line of the log after self.offset. Returns the number applied."""
+        if not os.path.exists(log_path):
+            return 0
+        applied = 0
+        with self._lock, open(log_path, "rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # torn or still being written
+                self.offset += len(raw)
+                try:
+                    submission = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(submission)
+                applied += 1
+        return applied
+
+    def model_table(self):
+        """Per-model MOS and variance, best first"""
+        with self._lock:
+            rows = [{"model_id": int(model_id), "model_name": MODEL_NAMES.get(int(model_id), "Unknown"), **describe(entry)}
+                    for model_id, entry in self.models.items()]
+        return sorted(rows, key=lambda row: -row["mos"])
+
+    def sample_stats(self, sample_id, model_id=None):
+        """Count, MOS and variance of one sample (optionally one model on it), or None if unrated"""
+        with self._lock:
+            if model_id is None:
+                entry = self.samples.get(str(sample_id))
+            else:
+                entry = self.sample_models.get(f"{sample_id}:{model_id}")
+            return describe(entry) if entry is not None else None
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "offset": self.offset,
+                "submissions": self.submissions,
+                "models": self.models,
+                "samples": self.samples,
+                "sample_models": self.sample_models
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        leaderboard = cls()
+        leaderboard.offset = data.get("offset", 0)
+        leaderboard.submissions = data.get("submissions", 0)
+        leaderboard.models = data.get("models", {})
+        leaderboard.samples = data.get("samples", {})
+        leaderboard.sample_models = data.get("sample_models", {})
+        return leaderboard
+
+    def save(self, path=SNAPSHOT_PATH):
+        """Atomically write the aggregates and log offset"""
+        data = self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH, log_path=STORE_PATH):
+        """Load the snapshot (or start empty) and replay anything newer from the log.
+
+        A snapshot whose offset lies past the end of the log belongs to a
+        different log, so the leaderboard is rebuilt instead.
+        """
+        leaderboard = cls()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                leaderboard = cls.from_dict(json.load(f))
+            log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            if leaderboard.offset > log_size:
+                leaderboard = cls()
+        leaderboard.catch_up(log_path)
+        return leaderboard
+
+
+def snapshot_path(log_path=STORE_PATH):
+    """Snapshot file kept next to a ratings log: ratings_results.jsonl -> ratings_results.leaderboard.json"""
+    return os.path.splitext(log_path)[0] + ".leaderboard.json"
+
+
+def rebuild(log_path=STORE_PATH, path=SNAPSHOT_PATH):
+    """Recompute the leaderboard from the whole ratings log and save it"""
+    leaderboard = Leaderboard()
+    leaderboard.catch_up(log_path)
+    leaderboard.save(path)
+    return leaderboard
+
+
+# Process-wide leaderboard, kept live by the ratings store
+_leaderboards = {}
+_lock = threading.Lock()
+
+
+def get_leaderboard(path=None, log_path=STORE_PATH):
+    """Return the shared live Leaderboard for log_path, subscribing it to the ratings store"""
+    path = path or snapshot_path(log_path)
+    with _lock:
+        leaderboard = _leaderboards.get(log_path)
+        if leaderboard is not None:
+            return leaderboard
+        store = get_ratings_store(log_path)
+        leaderboard = Leaderboard.load(path, log_path)
+        pending = [0]
+
+        def on_append(submissions, end_offset):
+            leaderboard.on_append(submissions, end_offset)
+            pending[0] += len(submissions)
+            if pending[0] >= SNAPSHOT_EVERY:
+                pending[0] = 0
+                leaderboard.save(path)
+
+        store.add_listener(on_append, catch_up=lambda: leaderboard.catch_up(log_path))
+        _leaderboards[log_path] = leaderboard
+        return leaderboard
+
+
+def print_table(leaderboard):
+    print(f"{leaderboard.submissions} submissions\n")
+    print(f"{'model':<16} {'n':>7} {'MOS':>6} {'var':>6}")
+    for row in leaderboard.model_table():
+        print(f"{row['model_name']:<16} {row['count']:>7} {row['mos']:>6.2f} {row['variance']:>6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Show live per-model MOS from the materialized leaderboard')
+    parser.add_argument('--snapshot', type=str, default=None, help='Leaderboard snapshot file (default: next to the ratings log)')
+    parser.add_argument('--ratings-log', type=str, default=STORE_PATH, help='JSONL ratings store')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the snapshot from the whole ratings log')
+    parser.add_argument('--import-json', type=str, nargs='?', const=LEGACY_PATH, metavar='PATH',
+                        help=f'First migrate a legacy ratings list (default {LEGACY_PATH}) into a new ratings log')
+
+    args = parser.parse_args()
+    if args.import_json:
+        import_json(args.import_json, args.ratings_log)
+    elif not os.path.exists(args.ratings_log) and os.path.exists(LEGACY_PATH):
+        print(f"{args.ratings_log} does not exist yet; pass --import-json to migrate {LEGACY_PATH}")
+    args.snapshot = args.snapshot or snapshot_path(args.ratings_log)
+    if args.rebuild:
+        leaderboard = rebuild(args.ratings_log, args.snapshot)
+    else:
+        leaderboard = Leaderboard.load(args.snapshot, args.ratings_log)
+        if os.path.exists(args.ratings_log):
+            leaderboard.save(args.snapshot)
+    print_table(leaderboard)
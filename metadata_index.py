@@ -0,0 +1,68 @@
+import os
+import json
+import hashlib
+import threading
+
+
+def find_audio_mapping(entry):
+    """The {audio_key: position} mapping of a metadata entry, stored under "audios_{id}" """
+    sample_id = str(entry["id"])
+    mapping = entry.get(f"audios_{sample_id}")
+    if mapping is None and sample_id.isdigit():
+        # Tolerate ids written with leading zeros
+        mapping = entry.get(f"audios_{int(sample_id)}")
+    return mapping
+
+
+class MetadataIndex:
+    """Parsed new_metadata.json, indexed by sample id.
+
+    Each entry is stored once with its audio mapping resolved up front under
+    "audio_mapping", so sampling and lookups never scan the corpus.
+    """
+
+    def __init__(self, entries):
+        self.entries = []
+        self.by_id = {}
+        for entry in entries:
+            record = {**entry, "audio_mapping": find_audio_mapping(entry)}
+            self.entries.append(record)
+            self.by_id[str(entry["id"])] = record
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, sample_id):
+        return self.by_id.get(str(sample_id))
+
+    def audio_mapping(self, sample_id):
+        record = self.get(sample_id)
+        return record["audio_mapping"] if record is not None else None
+
+
+# Process-wide index, rebuilt only when the file's content changes
+_state = {"index": None, "path": None, "stat": None, "digest": None}
+_lock = threading.Lock()
+
+
+def get_metadata_index(file_path="new_metadata.json"):
+    """Return the shared MetadataIndex for file_path, or None if the file does not exist.
+
+    Each call costs one stat(). A changed mtime or size triggers a hash of the
+    file, and the index is only re-parsed if the content actually changed.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _state["path"] == file_path and _state["stat"] == signature:
+            return _state["index"]
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        if _state["path"] != file_path or _state["digest"] != digest:
+            _state.update({"index": MetadataIndex(json.loads(raw)), "path": file_path, "digest": digest})
+        _state["stat"] = signature
+        return _state["index"]
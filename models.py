@@ -0,0 +1,11 @@
+"""Provider ids shared by the rating app, the analysis scripts and the audio indexers"""
+
+MODEL_NAMES = {
+    1: "AWS Polly",
+    2: "Google TTS",
+    3: "ElevenLabs TTS",
+    4: "Azure TTS"
+}
+
+# audio1 is ElevenLabs (3), audio2 Google (2), audio3 AWS (1), audio4 Azure (4)
+AUDIO_MODELS = {"audio1": 3, "audio2": 2, "audio3": 1, "audio4": 4}
@@ -0,0 +1,239 @@
+import json
+import argparse
+import itertools
+import numpy as np
+from analysis import flatten
+from models import MODEL_NAMES
+from ratings_store import default_ratings_path, load_submissions
+
+REPLICATES = 10_000
+CONFIDENCE = 0.95
+
+# Fewer clusters than this make the bootstrap distribution too lumpy to trust:
+# intervals and p-values are reported as None below it
+MIN_CLUSTERS = 10
+
+# Bootstrap weights are drawn in blocks of replicates so a block's weight
+# matrix stays around this many cells, however many clusters there are
+CHUNK_CELLS = 1 << 22
+
+
+def cluster_ids(arrays, by):
+    """Dense 0..C-1 cluster index of every rating: by sample (sentence) or by rater"""
+    if by == "sample":
+        keys = arrays["sample_id"]
+    elif by == "rater":
+        keys = arrays["rater"]
+    else:
+        raise ValueError(f"Unknown resampling unit: {by}")
+    _, clusters = np.unique(keys, return_inverse=True)
+    return clusters
+
+
+def cluster_sums(clusters, groups, values, num_groups):
+    """(C, G) per-cluster sums and counts of values for each group"""
+    num_clusters = int(clusters.max()) + 1 if len(clusters) else 0
+    cells = clusters * num_groups + groups
+    size = num_clusters * num_groups
+    sums = np.bincount(cells, weights=values, minlength=size).reshape(num_clusters, num_groups)
+    counts = np.bincount(cells, minlength=size).reshape(num_clusters, num_groups).astype(np.float64)
+    return sums, counts
+
+
+def resample_weights(num_clusters, replicates, rng):
+    """(replicates, C) counts of how often each cluster is drawn, C draws with replacement per replicate"""
+    draws = rng.integers(0, num_clusters, size=(replicates, num_clusters))
+    draws += np.arange(replicates)[:, None] * num_clusters
+    return np.bincount(draws.ravel(), minlength=replicates * num_clusters).reshape(replicates, num_clusters)
+
+
+def bootstrap_means(sums, counts, replicates=REPLICATES, rng=None):
+    """(replicates, G) cluster-bootstrap replicates of sum / count per group.
+
+    Resampling clusters with replacement is the same as weighting each
+    cluster by how often it was drawn, so a block of replicates is two
+    matrix products of its weight matrix with the per-cluster sums and counts.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    num_clusters = sums.shape[0]
+    chunk = max(1, CHUNK_CELLS // max(num_clusters, 1))
+    result = np.empty((replicates, sums.shape[1]))
+    for start in range(0, replicates, chunk):
+        stop = min(start + chunk, replicates)
+        weights = resample_weights(num_clusters, stop - start, rng).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[start:stop] = (weights @ sums) / (weights @ counts)
+    return result
+
+
+def percentile_interval(replicates, confidence=CONFIDENCE):
+    """Percentile bootstrap interval per column"""
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+    return low, high
+
+
+def is_degenerate(replicates):
+    """True if the replicates collapse to a single value (or none), so they carry no spread"""
+    replicates = replicates[~np.isnan(replicates)]
+    return len(replicates) == 0 or replicates.min() == replicates.max()
+
+
+def bootstrap_p_value(replicates, null=0.0):
+    """Two-sided bootstrap p-value that a statistic differs from null, or NaN for a degenerate distribution"""
+    replicates = replicates[~np.isnan(replicates)]
+    if is_degenerate(replicates):
+        return float("nan")
+    below = np.count_nonzero(replicates <= null)
+    above = np.count_nonzero(replicates >= null)
+    return float(min(1.0, 2 * (min(below, above) + 1) / (len(replicates) + 1)))
+
+
+def paired_ratings(arrays, models):
+    """Ratings of the same sample by the same rater, one row per (submission, sample), one column per model.
+
+    Missing ratings are NaN. Returns (matrix, sample_id, rater) with one entry per row.
+    """
+    keys = arrays["submission"] * (int(arrays["sample_id"].max()) + 1 if len(arrays["sample_id"]) else 1) + arrays["sample_id"]
+    _, rows = np.unique(keys, return_inverse=True)
+    num_rows = int(rows.max()) + 1 if len(rows) else 0
+    column = np.full(int(arrays["model_id"].max()) + 1 if len(rows) else 0, -1)
+    column[models] = np.arange(len(models))
+    columns = column[arrays["model_id"]]
+    keep = columns >= 0
+    matrix = np.full((num_rows, len(models)), np.nan)
+    matrix[rows[keep], columns[keep]] = arrays["rating"][keep]
+    sample_id = np.zeros(num_rows, dtype=np.int64)
+    rater = np.zeros(num_rows, dtype=np.int64)
+    sample_id[rows] = arrays["sample_id"]
+    rater[rows] = arrays["rater"]
+    return matrix, sample_id, rater
+
+
+def model_intervals(arrays, clusters, replicates=REPLICATES, confidence=CONFIDENCE, rng=None):
+    """Per-model MOS with a cluster-bootstrap interval. Also returns the (replicates, models) MOS matrix."""
+    models = np.unique(arrays["model_id"])
+    groups = np.searchsorted(models, arrays["model_id"])
+    sums, counts = cluster_sums(clusters, groups, arrays["rating"].astype(np.float64), len(models))
+    boot = bootstrap_means(sums, counts, replicates, rng)
+    low, high = percentile_interval(boot, confidence)
+    totals, numbers = sums.sum(axis=0), counts.sum(axis=0)
+    cluster_counts = np.count_nonzero(counts, axis=0)
+    result = {}
+    for i, model_id in enumerate(models):
+        reliable = cluster_counts[i] >= MIN_CLUSTERS and not is_degenerate(boot[:, i])
+        result[int(model_id)] = {
+            "model_name": MODEL_NAMES.get(int(model_id), "Unknown"),
+            "count": int(numbers[i]),
+            "clusters": int(cluster_counts[i]),
+            "mos": float(totals[i] / numbers[i]),
+            "ci_low": float(low[i]) if reliable else None,
+            "ci_high": float(high[i]) if reliable else None,
+            "degenerate": bool(is_degenerate(boot[:, i]))
+        }
+    return result, models, boot
+
+
+def pairwise_tests(arrays, by, models, mos_boot, replicates=REPLICATES, confidence=CONFIDENCE, rng=None):
+    """MOS difference and head-to-head win rate for every pair of models, with bootstrap intervals and p-values.
+
+    A win is one model rated above the other on the same sample by the same
+    rater; ties count as half a win. mos_boot must come from the same clusters.
+    Pairs compared in fewer than MIN_CLUSTERS clusters get no intervals or
+    p-values, and a replicate distribution that collapses to one value is
+    flagged as degenerate rather than turned into a p-value.
+    """
+    matrix, sample_id, rater = paired_ratings(arrays, models)
+    _, clusters = np.unique(sample_id if by == "sample" else rater, return_inverse=True)
+    pairs = list(itertools.combinations(range(len(models)), 2))
+    if not pairs:
+        return []
+    first, second = np.array(pairs).T
+    a, b = matrix[:, first], matrix[:, second]
+    both = ~(np.isnan(a) | np.isnan(b))
+    with np.errstate(invalid="ignore"):
+        wins = np.where(both, (a > b) + 0.5 * (a == b), 0.0)
+
+    # Same per-cluster sums trick as for MOS, with one group per pair
+    num_clusters = int(clusters.max()) + 1
+    win_sums = np.stack([np.bincount(clusters, weights=wins[:, i], minlength=num_clusters)
+                         for i in range(len(pairs))], axis=1)
+    win_counts = np.stack([np.bincount(clusters, weights=both[:, i], minlength=num_clusters)
+                           for i in range(len(pairs))], axis=1)
+    win_boot = bootstrap_means(win_sums, win_counts, replicates, rng)
+    win_low, win_high = percentile_interval(win_boot, confidence)
+
+    diff_boot = mos_boot[:, first] - mos_boot[:, second]
+    diff_low, diff_high = percentile_interval(diff_boot, confidence)
+    comparisons = win_counts.sum(axis=0)
+    paired_clusters = np.count_nonzero(win_counts, axis=0)
+
+    results = []
+    for i, (x, y) in enumerate(pairs):
+        enough = paired_clusters[i] >= MIN_CLUSTERS
+        diff_degenerate = is_degenerate(diff_boot[:, i])
+        win_degenerate = is_degenerate(win_boot[:, i])
+        results.append({
+            "model_a": int(models[x]),
+            "model_b": int(models[y]),
+            "mos_diff_ci": [float(diff_low[i]), float(diff_high[i])] if enough and not diff_degenerate else None,
+            "mos_diff_p_value": bootstrap_p_value(diff_boot[:, i]) if enough and not diff_degenerate else None,
+            "comparisons": int(comparisons[i]),
+            "clusters": int(paired_clusters[i]),
+            "win_rate": float(win_sums[:, i].sum() / comparisons[i]) if comparisons[i] else None,
+            "win_rate_ci": [float(win_low[i]), float(win_high[i])] if enough and not win_degenerate else None,
+            "win_rate_p_value": bootstrap_p_value(win_boot[:, i], null=0.5) if enough and not win_degenerate else None,
+            "degenerate": bool(diff_degenerate or win_degenerate)
+        })
+    return results
+
+
+def compare_models(arrays, by="sample", replicates=REPLICATES, confidence=CONFIDENCE, seed=None):
+    """Bootstrap MOS intervals and pairwise tests, resampling whole samples or whole raters"""
+    rng = np.random.default_rng(seed)
+    clusters = cluster_ids(arrays, by)
+    models, model_ids, mos_boot = model_intervals(arrays, clusters, replicates, confidence, rng)
+    pairs = pairwise_tests(arrays, by, model_ids, mos_boot, replicates, confidence, rng)
+    for pair in pairs:
+        pair["mos_diff"] = models[pair["model_a"]]["mos"] - models[pair["model_b"]]["mos"]
+    return {"by": by, "replicates": replicates, "confidence": confidence, "models": models, "pairs": pairs}
+
+
+def print_report(report):
+    print(f"Resampling by {report['by']}, {report['replicates']} replicates, "
+          f"{report['confidence']:.0%} intervals\n")
+    print(f"{'model':<16} {'n':>8} {'MOS':>6} {'interval':>15}")
+    for model in sorted(report["models"].values(), key=lambda m: -m["mos"]):
+        interval = f"[{model['ci_low']:.3f}, {model['ci_high']:.3f}]" if model["ci_low"] is not None else "-"
+        print(f"{model['model_name']:<16} {model['count']:>8} {model['mos']:>6.3f} {interval:>15}")
+    print(f"\n{'pair':<33} {'ΔMOS':>7} {'p':>7} {'win rate':>9} {'p':>7}")
+    for pair in report["pairs"]:
+        names = f"{MODEL_NAMES.get(pair['model_a'], 'Unknown')} vs {MODEL_NAMES.get(pair['model_b'], 'Unknown')}"
+        win_rate = f"{pair['win_rate']:.3f}" if pair["win_rate"] is not None else "-"
+        mos_p = f"{pair['mos_diff_p_value']:.4f}" if pair["mos_diff_p_value"] is not None else "-"
+        win_p = f"{pair['win_rate_p_value']:.4f}" if pair["win_rate_p_value"] is not None else "-"
+        note = "  (too few comparisons)" if pair["clusters"] < MIN_CLUSTERS else ""
+        print(f"{names:<33} {pair['mos_diff']:>+7.3f} {mos_p:>7} {win_rate:>9} {win_p:>7}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bootstrap confidence intervals and pairwise significance tests for MOS')
+    parser.add_argument('--ratings-file', type=str, default=default_ratings_path(),
+                        help='Ratings store (.jsonl) or legacy ratings_results.json')
+    parser.add_argument('--by', type=str, nargs='+', choices=['sample', 'rater'], default=['sample', 'rater'],
+                        help='Resampling unit(s)')
+    parser.add_argument('--replicates', type=int, default=REPLICATES, help='Bootstrap replicates')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help='Interval coverage')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--json', action='store_true', help='Print the reports as JSON')
+
+    args = parser.parse_args()
+    arrays = flatten(load_submissions(args.ratings_file))
+    reports = [compare_models(arrays, by, args.replicates, args.confidence, args.seed) for by in args.by]
+    if args.json:
+        print(json.dumps(reports, indent=4))
+    else:
+        for n, report in enumerate(reports):
+            if n:
+                print()
+            print_report(report)
@@ -0,0 +1,179 @@
+from collections import namedtuple
+
+# Bitrates in kbps indexed by [version_class][layer][bitrate_index];
+# version_class 1 = MPEG-1, 2 = MPEG-2 / 2.5
+BITRATES = {
+    1: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    2: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates indexed by the version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+FrameHeader = namedtuple(
+    "FrameHeader",
+    "offset length version layer bitrate sample_rate samples channels"
+)
+
+
+def parse_header(data, offset):
+    """Decode the 4-byte MPEG audio frame header at offset, or return None if invalid"""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0x3
+    layer_bits = (b1 >> 1) & 0x3
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    version_class = 1 if version_bits == 3 else 2
+    bitrate = BITRATES[version_class][layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 0x1
+    channels = 1 if (b3 >> 6) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version_class == 1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    version = {3: 1.0, 2: 2.0, 0: 2.5}[version_bits]
+    return FrameHeader(offset, length, version, layer, bitrate, sample_rate, samples, channels)
+
+
+def skip_id3v2(data):
+    """Return the offset of the first byte after a leading ID3v2 tag (0 if none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def iter_frames(data, offset=None):
+    """Yield the FrameHeader of every frame in an MP3 byte string.
+
+    After garbage, a candidate sync word is only accepted if the frame it
+    describes is followed by another valid header (or the end of the data).
+    """
+    offset = skip_id3v2(data) if offset is None else offset
+    end = len(data)
+    synced = False
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is not None and header.length > 4:
+            next_offset = offset + header.length
+            if synced or next_offset >= end - 4 or parse_header(data, next_offset) is not None:
+                if next_offset > end:
+                    return  # truncated final frame
+                synced = True
+                yield header
+                offset = next_offset
+                continue
+        synced = False
+        next_sync = data.find(b"\xff", offset + 1)
+        if next_sync < 0:
+            return
+        offset = next_sync
+
+
+def is_info_frame(data, header):
+    """True if the frame holds a Xing/Info or VBRI header instead of audio"""
+    frame = data[header.offset:header.offset + min(header.length, 64)]
+    return b"Xing" in frame or b"Info" in frame or b"VBRI" in frame
+
+
+def side_info_size(header):
+    """Bytes of Layer III side information following the 4-byte header"""
+    if header.version == 1.0:
+        return 17 if header.channels == 1 else 32
+    return 9 if header.channels == 1 else 17
+
+
+def parse_info_frame(data, header):
+    """Decode the Xing/Info or VBRI header carried by a frame, or return None.
+
+    Returns {"tag", "frames", "bytes"}; frames and bytes are None when the
+    header omits them. Counts exclude the info frame itself.
+    """
+    xing = header.offset + 4 + side_info_size(header)
+    tag = bytes(data[xing:xing + 4])
+    if tag in (b"Xing", b"Info") and xing + 8 <= len(data):
+        flags = int.from_bytes(data[xing + 4:xing + 8], "big")
+        position = xing + 8
+        frames = total_bytes = None
+        if flags & 0x1 and position + 4 <= len(data):
+            frames = int.from_bytes(data[position:position + 4], "big")
+            position += 4
+        if flags & 0x2 and position + 4 <= len(data):
+            total_bytes = int.from_bytes(data[position:position + 4], "big")
+        return {"tag": tag.decode("ascii"), "frames": frames, "bytes": total_bytes}
+    # VBRI always sits 32 bytes after the header: tag, version, delay, quality, bytes, frames
+    vbri = header.offset + 4 + 32
+    if bytes(data[vbri:vbri + 4]) == b"VBRI" and vbri + 18 <= len(data):
+        return {
+            "tag": "VBRI",
+            "frames": int.from_bytes(data[vbri + 14:vbri + 18], "big"),
+            "bytes": int.from_bytes(data[vbri + 10:vbri + 14], "big")
+        }
+    return None
+
+
+def split_at_times(data, cut_times):
+    """Split MP3 bytes at the frame boundaries closest to each cut time (in seconds).
+
+    Returns len(cut_times) + 1 byte strings. Xing/Info frames are dropped, since
+    their frame counts describe the whole input rather than any one segment.
+    Cuts are frame-accurate but ignore the bit reservoir, so the first frame of
+    each segment may decode with a few milliseconds of glitch; callers should cut
+    inside pauses.
+    """
+    frames = [f for f in iter_frames(data) if not is_info_frame(data, f)]
+    if not frames:
+        raise ValueError("No MPEG audio frames found")
+
+    boundaries = []
+    elapsed = 0.0
+    frame_index = 0
+    for cut in sorted(cut_times):
+        while frame_index < len(frames):
+            duration = frames[frame_index].samples / frames[frame_index].sample_rate
+            # Cut before this frame if its midpoint is past the cut time
+            if elapsed + duration / 2 > cut:
+                break
+            elapsed += duration
+            frame_index += 1
+        boundaries.append(frame_index)
+
+    segments = []
+    start = 0
+    for boundary in boundaries + [len(frames)]:
+        chunk = frames[start:boundary]
+        if chunk:
+            segments.append(data[chunk[0].offset:chunk[-1].offset + chunk[-1].length])
+        else:
+            segments.append(b"")
+        start = boundary
+    return segments
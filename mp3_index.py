@@ -0,0 +1,172 @@
+import io
+import os
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from audio_archive import iter_audio_files
+from audio_io import atomic_output
+from models import MODEL_NAMES, AUDIO_MODELS
+from mp3_frames import iter_frames, parse_info_frame
+
+INDEX_PATH = "audio_index.csv"
+
+FIELDS = ("sample_id", "audio_key", "model_id", "model_name", "duration", "bitrate", "sample_rate",
+          "channels", "frames", "vbr", "source", "size", "mtime_ns")
+
+# Column types used when reading the index back
+NUMERIC_FIELDS = {"model_id": int, "duration": float, "bitrate": int, "sample_rate": int, "channels": int,
+                  "frames": int, "vbr": int, "size": int, "mtime_ns": int}
+
+# Clips per rating session: 10 samples x 4 providers
+SESSION_SAMPLES = 10
+
+
+def scan_mp3(data):
+    """Duration, bitrate, sample rate and frame count of MP3 bytes, from frame headers only.
+
+    A Xing/Info or VBRI header with a frame count answers directly; otherwise
+    every frame header is walked. Returns None if no MPEG audio is found.
+    """
+    frames = iter_frames(data)
+    first = next(frames, None)
+    if first is None:
+        return None
+    info = parse_info_frame(data, first)
+    if info is not None and info["frames"]:
+        duration = info["frames"] * first.samples / first.sample_rate
+        audio_bytes = info["bytes"] or len(data) - first.offset - first.length
+        return {
+            "duration": duration,
+            "bitrate": round(audio_bytes * 8 / duration) if duration else 0,
+            "sample_rate": first.sample_rate,
+            "channels": first.channels,
+            "frames": info["frames"],
+            "vbr": int(info["tag"] != "Info"),
+            "source": info["tag"].lower()
+        }
+
+    # No usable info header: walk the frames, skipping an info frame without counts
+    count = samples = audio_bytes = 0
+    bitrates = set()
+    for header in ([] if info is not None else [first]) + list(frames):
+        count += 1
+        samples += header.samples
+        audio_bytes += header.length
+        bitrates.add(header.bitrate)
+    duration = samples / first.sample_rate
+    return {
+        "duration": duration,
+        "bitrate": round(audio_bytes * 8 / duration) if duration else 0,
+        "sample_rate": first.sample_rate,
+        "channels": first.channels,
+        "frames": count,
+        "vbr": int(len(bitrates) > 1),
+        "source": "scan"
+    }
+
+
+def scan_file(job):
+    """Worker: (sample_id, audio_key, path) -> index row, or an error string"""
+    sample_id, audio_key, path = job
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            stats = scan_mp3(f.read())
+    except OSError as e:
+        return f"{path}: {str(e)}"
+    if stats is None:
+        return f"{path}: no MPEG audio frames found"
+    model_id = AUDIO_MODELS.get(audio_key, 0)
+    return {
+        "sample_id": sample_id,
+        "audio_key": audio_key,
+        "model_id": model_id,
+        "model_name": MODEL_NAMES.get(model_id, "Unknown"),
+        **stats,
+        "duration": round(stats["duration"], 4),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+
+
+def load_index(index_path=INDEX_PATH):
+    """{(sample_id, audio_key): row} from an index CSV, with numeric columns converted"""
+    if not os.path.exists(index_path):
+        return {}
+    index = {}
+    with open(index_path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for field, convert in NUMERIC_FIELDS.items():
+                row[field] = convert(row[field])
+            index[(row["sample_id"], row["audio_key"])] = row
+    return index
+
+
+def write_index(rows, index_path=INDEX_PATH):
+    """Atomically write index rows as CSV, sorted by sample and audio key"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(sorted(rows, key=lambda row: (int(row["sample_id"]), row["audio_key"])))
+    with atomic_output(index_path) as f:
+        f.write(buffer.getvalue().encode("utf-8"))
+
+
+def build_index(base_dir="audios", index_path=INDEX_PATH, workers=None):
+    """Scan every audios_N/audioK.mp3 into index_path and return the rows.
+
+    Files whose size and mtime match their existing row are not re-read;
+    the rest are scanned in a process pool.
+    """
+    previous = load_index(index_path)
+    rows, jobs = [], []
+    for sample_id, number, path in iter_audio_files(base_dir):
+        key = (str(sample_id), f"audio{number}")
+        row = previous.get(key)
+        stat = os.stat(path)
+        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            rows.append(row)
+        else:
+            jobs.append((*key, path))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(scan_file, jobs, chunksize=32):
+                if isinstance(result, str):
+                    print(f"Could not index {result}")
+                else:
+                    rows.append(result)
+    write_index(rows, index_path)
+    return rows
+
+
+def print_summary(rows):
+    """Per-provider clip durations, bitrates and the expected listening time of a session"""
+    print(f"{len(rows)} clips\n")
+    print(f"{'model':<16} {'clips':>6} {'mean s':>7} {'total min':>10} {'kbps':>6} {'Hz':>7}")
+    per_sample = {}
+    for model_id, model_name in sorted(MODEL_NAMES.items()):
+        model_rows = [row for row in rows if row["model_id"] == model_id]
+        if not model_rows:
+            continue
+        total = sum(row["duration"] for row in model_rows)
+        kbps = sum(row["bitrate"] for row in model_rows) / len(model_rows) / 1000
+        rates = sorted({row["sample_rate"] for row in model_rows})
+        print(f"{model_name:<16} {len(model_rows):>6} {total / len(model_rows):>7.2f} {total / 60:>10.1f} "
+              f"{kbps:>6.1f} {'/'.join(map(str, rates)):>7}")
+    for row in rows:
+        per_sample[row["sample_id"]] = per_sample.get(row["sample_id"], 0.0) + row["duration"]
+    if per_sample:
+        mean_sample = sum(per_sample.values()) / len(per_sample)
+        print(f"\nListening time per session ({SESSION_SAMPLES} samples, every clip once): "
+              f"{SESSION_SAMPLES * mean_sample / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Index duration, bitrate and sample rate of every clip from its MP3 frame headers')
+    parser.add_argument('--audio-dir', type=str, default='audios', help='Directory holding audios_N/audioK.mp3')
+    parser.add_argument('--index', type=str, default=INDEX_PATH, help='CSV index to write')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+
+    args = parser.parse_args()
+    print_summary(build_index(args.audio_dir, args.index, args.workers))
@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from audio_archive import iter_audio_files
+from audio_io import set_default_mode
+from mp3_frames import iter_frames
+
+# Loudness target for speech streamed to headphones / laptop speakers
+TARGET_LUFS = -16.0
+TRUE_PEAK = -1.5
+LOUDNESS_RANGE = 11.0
+
+# Output codecs: extension, ffmpeg muxer and encoder arguments
+CODECS = {
+    "mp3": {"extension": ".mp3", "format": "mp3", "args": ["-c:a", "libmp3lame"], "bitrate": "64k"},
+    "opus": {"extension": ".opus", "format": "ogg", "args": ["-c:a", "libopus", "-application", "voip"], "bitrate": "24k"},
+}
+
+# Sample rates libopus can encode at; anything else is resampled to 48 kHz
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+MANIFEST_NAME = ".postprocess.json"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_key(settings):
+    """Short hash of the processing settings, stored with every output"""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def source_sample_rate(path):
+    """Sample rate of the first MPEG frame, or None if the file has none"""
+    with open(path, "rb") as f:
+        data = f.read(64 * 1024)
+    for header in iter_frames(data):
+        return header.sample_rate
+    return None
+
+
+def measure_loudness(ffmpeg, path, settings):
+    """First loudnorm pass: the file's integrated loudness, true peak, range and threshold"""
+    loudnorm = f"loudnorm=I={settings['target_lufs']}:TP={settings['true_peak']}:LRA={settings['lra']}:print_format=json"
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostats", "-i", path, "-af", loudnorm, "-f", "null", "-"],
+        capture_output=True, text=True, check=True
+    )
+    # loudnorm prints its JSON block last on stderr
+    match = re.search(r"\{[^{}]*\}\s*$", result.stderr)
+    if match is None:
+        raise ValueError(f"No loudnorm measurement in ffmpeg output for {path}")
+    return json.loads(match.group(0))
+
+
+def normalize_file(ffmpeg, source, output_file, settings):
+    """Two-pass loudness normalization of source, encoded per settings and atomically written to output_file"""
+    measured = measure_loudness(ffmpeg, source, settings)
+    loudnorm = (
+        f"loudnorm=I={settings['target_lufs']}:TP={settings['true_peak']}:LRA={settings['lra']}"
+        f":measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+        f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+        f":offset={measured['target_offset']}:linear=true"
+    )
+    codec = CODECS[settings["codec"]]
+    # loudnorm resamples to 192 kHz internally; go back to the source rate
+    sample_rate = source_sample_rate(source) or 48000
+    if settings["codec"] == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        sample_rate = 48000
+
+    directory = os.path.dirname(output_file) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(output_file)}.", suffix=".part")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [ffmpeg, "-hide_banner", "-nostats", "-loglevel", "error", "-y", "-i", source,
+             "-af", loudnorm, "-ar", str(sample_rate), "-ac", "1", "-map_metadata", "-1",
+             *codec["args"], "-b:a", settings["bitrate"], "-f", codec["format"], tmp_path],
+            capture_output=True, text=True, check=True
+        )
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return measured
+
+
+def process_job(job):
+    """Worker: hash one source file and normalize it unless the manifest already has this content.
+
+    Returns (relative path, manifest entry, whether ffmpeg ran, error message or None).
+    """
+    relative, source, output_file, settings, key, previous, ffmpeg = job
+    try:
+        digest = file_sha256(source)
+        if (previous is not None and previous.get("source_sha256") == digest
+                and previous.get("settings") == key and os.path.exists(output_file)):
+            stat = os.stat(source)
+            # Touched but unchanged: refresh the stat so the next run skips it without hashing
+            return relative, {**previous, "source_stat": [stat.st_mtime_ns, stat.st_size]}, False, None
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        measured = normalize_file(ffmpeg, source, output_file, settings)
+        stat = os.stat(source)
+        return relative, {
+            "source_sha256": digest,
+            "source_stat": [stat.st_mtime_ns, stat.st_size],
+            "settings": key,
+            "output": os.path.basename(output_file),
+            "input_lufs": float(measured["input_i"]),
+            "input_true_peak": float(measured["input_tp"])
+        }, True, None
+    except subprocess.CalledProcessError as e:
+        lines = (e.stderr or str(e)).strip().splitlines()
+        return relative, None, False, lines[-1] if lines else str(e)
+    except Exception as e:
+        return relative, None, False, str(e)
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest, path):
+    """Atomically write the manifest"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    set_default_mode(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def postprocess_audio(base_dir="audios", output_dir="audios_normalized", codec="mp3", bitrate=None,
+                      target_lufs=TARGET_LUFS, true_peak=TRUE_PEAK, lra=LOUDNESS_RANGE, workers=None, force=False):
+    """Loudness-normalize (and optionally transcode) every audios_N/audioK.mp3 into output_dir.
+
+    The manifest in output_dir records each source's content hash and the
+    settings used, so re-runs only process new or changed files. A source
+    whose mtime and size match the manifest is skipped without being read.
+    Returns {"processed", "skipped", "failed"} counts.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on PATH")
+    settings = {
+        "codec": codec,
+        "bitrate": bitrate or CODECS[codec]["bitrate"],
+        "target_lufs": target_lufs,
+        "true_peak": true_peak,
+        "lra": lra
+    }
+    key = settings_key(settings)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+    jobs = []
+    for sample_id, number, source in sorted(iter_audio_files(base_dir)):
+        relative = f"audios_{sample_id}/audio{number}"
+        output_file = os.path.join(output_dir, f"audios_{sample_id}", f"audio{number}{CODECS[codec]['extension']}")
+        previous = manifest.get(relative)
+        if previous is not None and previous.get("settings") == key and os.path.exists(output_file):
+            stat = os.stat(source)
+            if previous.get("source_stat") == [stat.st_mtime_ns, stat.st_size]:
+                counts["skipped"] += 1
+                continue
+        jobs.append((relative, source, output_file, settings, key, previous, ffmpeg))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_job, job) for job in jobs]
+            try:
+                for future in as_completed(futures):
+                    relative, entry, processed, error = future.result()
+                    if error is not None:
+                        print(f"Failed to process {relative}: {error}")
+                        counts["failed"] += 1
+                        continue
+                    counts["processed" if processed else "skipped"] += 1
+                    manifest[relative] = entry
+            finally:
+                save_manifest(manifest, manifest_path)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Loudness-normalize and optionally transcode the generated audio')
+    parser.add_argument('--audio-dir', type=str, default='audios', help='Directory holding audios_N/audioK.mp3')
+    parser.add_argument('--output-dir', type=str, default='audios_normalized', help='Directory receiving the processed files')
+    parser.add_argument('--codec', type=str, choices=sorted(CODECS), default='mp3', help='Output codec (opus is smaller for streaming)')
+    parser.add_argument('--bitrate', type=str, help='Output bitrate (default: 64k for mp3, 24k for opus)')
+    parser.add_argument('--target-lufs', type=float, default=TARGET_LUFS, help='Integrated loudness target')
+    parser.add_argument('--true-peak', type=float, default=TRUE_PEAK, help='Maximum true peak in dBTP')
+    parser.add_argument('--lra', type=float, default=LOUDNESS_RANGE, help='Loudness range target')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='Ignore the manifest and reprocess every file')
+
+    args = parser.parse_args()
+    try:
+        counts = postprocess_audio(args.audio_dir, args.output_dir, args.codec, args.bitrate, args.target_lufs,
+                                   args.true_peak, args.lra, args.workers, args.force)
+    except RuntimeError as e:
+        parser.error(str(e))
+    print(f"Processed {counts['processed']}, unchanged {counts['skipped']}, failed {counts['failed']}")
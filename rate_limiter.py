@@ -0,0 +1,119 @@
+import time
+import threading
+
+# Error codes providers use to signal that we are over quota
+THROTTLE_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "SlowDown",
+}
+THROTTLE_EXCEPTION_NAMES = {"ResourceExhausted", "TooManyRequests"}
+
+
+def is_throttle_error(error):
+    """Detect rate-limit errors from requests, boto3 and google-cloud without importing them"""
+    response = getattr(error, "response", None)
+    # requests.HTTPError carries the Response object
+    if getattr(response, "status_code", None) == 429:
+        return True
+    # botocore ClientError carries the parsed error dict
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if code in THROTTLE_ERROR_CODES or status == 429:
+            return True
+    # google.api_core exceptions expose the HTTP status as .code
+    if type(error).__name__ in THROTTLE_EXCEPTION_NAMES or getattr(error, "code", None) == 429:
+        return True
+    return False
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Callers reserve tokens and sleep for the returned delay."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take amount tokens, going into debt if needed. Returns seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+
+class ProviderRateLimiter:
+    """Requests-per-second and characters-per-minute limits for one provider.
+
+    The limiter is shared by every worker calling the provider. When the provider
+    throttles us, the effective rate is halved (at most once per backoff window);
+    each successful call then recovers a small fraction of the configured rate.
+    """
+
+    def __init__(self, requests_per_second, chars_per_minute=None, burst=1,
+                 min_fraction=0.05, recovery=0.02, backoff_window=2.0):
+        self.requests_per_second = requests_per_second
+        self.chars_per_minute = chars_per_minute
+        self.min_fraction = min_fraction
+        self.recovery = recovery
+        self.backoff_window = backoff_window
+        self.fraction = 1.0
+        self.throttled = 0
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_second, max(1, burst))
+        self._chars = TokenBucket(chars_per_minute / 60.0, chars_per_minute) if chars_per_minute else None
+
+    def acquire(self, chars=0, requests=1):
+        """Block until `requests` requests totalling chars characters may be sent"""
+        wait = self._requests.reserve(requests)
+        if self._chars is not None and chars:
+            wait = max(wait, self._chars.reserve(chars))
+        if wait > 0:
+            time.sleep(wait)
+
+    def _apply_fraction(self):
+        self._requests.set_rate(self.requests_per_second * self.fraction)
+        if self._chars is not None:
+            self._chars.set_rate(self.chars_per_minute / 60.0 * self.fraction)
+
+    def on_throttle(self):
+        """Multiplicatively decrease the rate after a 429 / throttling error"""
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            # Many in-flight requests fail together; count that as one signal
+            if now - self._last_backoff < self.backoff_window:
+                return
+            self._last_backoff = now
+            self.fraction = max(self.min_fraction, self.fraction / 2)
+            self._apply_fraction()
+
+    def on_success(self):
+        """Additively recover towards the configured rate"""
+        with self._lock:
+            if self.fraction >= 1.0:
+                return
+            self.fraction = min(1.0, self.fraction + self.recovery)
+            self._apply_fraction()
+
+    def current_rate(self):
+        """Effective requests per second after adaptive backoff"""
+        return self.requests_per_second * self.fraction
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from concurrent.futures import Future
+from audio_io import set_default_mode, truncate_torn_tail
+
+STORE_PATH = "ratings_results.jsonl"
+LEGACY_PATH = "ratings_results.json"
+
+
+# Group commit: a batch is written once this many submissions are queued,
+# or this long after the first one arrived, whichever comes first
+MAX_BATCH = 64
+MAX_BATCH_DELAY = 0.002
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued submissions in batches.
+
+    Concurrent callers of submit() share one append and one fsync per batch,
+    and each gets a Future that resolves only once its batch is durable.
+    """
+
+    def __init__(self, store, max_batch=MAX_BATCH, max_delay=MAX_BATCH_DELAY):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.committed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ratings-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, submission):
+        future = Future()
+        self._queue.put((submission, future))
+        return future
+
+    def _collect(self, first):
+        """Gather a batch starting with first. Returns (batch, stop)."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Take whatever is already queued, then wait out the rest of the window
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            try:
+                self.store.append_many([submission for submission, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.committed += len(batch)
+            for _, future in batch:
+                future.set_result(True)
+
+    def close(self):
+        """Commit everything queued so far and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class RatingsStore:
+    """Append-only JSONL store of rating submissions.
+
+    Every submission is one line written with a single append and fsync, so a
+    submit costs the same however many ratings exist, and a crash can at worst
+    leave a torn final line, which readers skip and opening the store cuts off.
+    submit() goes through a group-commit writer so concurrent sessions share fsyncs.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # A torn last line from a crash would swallow the next appended submission
+        truncate_torn_tail(path)
+        # Binary append mode, so tell() is the byte offset readers can resume from
+        self._file = open(path, "ab")
+        self._writer = None
+        self._listeners = []
+
+    def add_listener(self, listener, catch_up=None):
+        """Call listener(submissions, end_offset) after every durable append.
+
+        catch_up, if given, runs first under the same lock, so no append can
+        slip in between a listener reading the existing log and registering.
+        """
+        with self._lock:
+            if catch_up is not None:
+                catch_up()
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop calling a listener registered with add_listener; unknown listeners are ignored"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def submit(self, submission, timeout=None):
+        """Queue a submission for the next group commit and wait until it is durable"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = GroupCommitWriter(self)
+            writer = self._writer
+        return writer.submit(submission).result(timeout)
+
+    def append(self, submission):
+        self.append_many([submission])
+
+    def append_many(self, submissions):
+        """Durably append several submissions with one write and one fsync"""
+        data = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in submissions).encode("utf-8")
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            end_offset = self._file.tell()
+            for listener in self._listeners:
+                try:
+                    listener(submissions, end_offset)
+                except Exception as e:
+                    # The submissions are already durable; a listener can rebuild from the log
+                    print(f"Ratings store listener error: {str(e)}")
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        with self._lock:
+            self._file.close()
+
+
+def iter_submissions(path=STORE_PATH):
+    """Yield every submission in a JSONL store, skipping a torn final line"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            try:
+                yield json.loads(raw)
+            except json.JSONDecodeError:
+                continue  # torn write from a crash
+
+
+def default_ratings_path():
+    """The JSONL store if it exists, otherwise the legacy ratings_results.json"""
+    return STORE_PATH if os.path.exists(STORE_PATH) else LEGACY_PATH
+
+
+def load_submissions(path=STORE_PATH):
+    """All submissions, from the JSONL store or (by extension) a legacy JSON list"""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return list(iter_submissions(path))
+
+
+def write_jsonl(submissions, path):
+    """Atomically write submissions as a new JSONL file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for submission in submissions:
+            f.write(json.dumps(submission, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    set_default_mode(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def import_json(json_path=LEGACY_PATH, store_path=STORE_PATH):
+    """One-shot migration of a ratings_results.json list into a new JSONL store.
+
+    Does nothing if the store already exists. Returns the number of submissions imported.
+    """
+    if os.path.exists(store_path) or not os.path.exists(json_path):
+        return 0
+    with open(json_path, "r", encoding="utf-8") as f:
+        submissions = json.load(f)
+    write_jsonl(submissions, store_path)
+    return len(submissions)
+
+
+def export_json(store_path=STORE_PATH, json_path=LEGACY_PATH):
+    """Write the store back out in the old ratings_results.json format"""
+    submissions = list(iter_submissions(store_path))
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(submissions, f, indent=4, ensure_ascii=False)
+    return len(submissions)
+
+
+# Process-wide stores, one open file per path
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_ratings_store(path=STORE_PATH, legacy_path=LEGACY_PATH):
+    """Return the shared RatingsStore for path, importing legacy_path first if the store is new"""
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            if legacy_path:
+                import_json(legacy_path, path)
+            store = RatingsStore(path)
+            _stores[path] = store
+        return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import, export or count rating submissions')
+    parser.add_argument('--store', type=str, default=STORE_PATH, help='JSONL ratings store')
+    parser.add_argument('--import-json', type=str, metavar='PATH', help='Import a ratings_results.json list into a new store')
+    parser.add_argument('--export-json', type=str, metavar='PATH', help='Write the store out as a ratings_results.json list')
+
+    args = parser.parse_args()
+    if args.import_json:
+        if os.path.exists(args.store):
+            parser.error(f"{args.store} already exists; refusing to import over it")
+        print(f"Imported {import_json(args.import_json, args.store)} submissions into {args.store}")
+    if args.export_json:
+        print(f"Exported {export_json(args.store, args.export_json)} submissions to {args.export_json}")
+    if not args.import_json and not args.export_json:
+        print(f"{sum(1 for _ in iter_submissions(args.store))} submissions in {args.store}")
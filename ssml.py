@@ -0,0 +1,112 @@
+import re
+import argparse
+from xml.sax.saxutils import escape
+
+# A run of Devanagari words, including the spaces between them, so "कल शाम को"
+# becomes one <lang> element rather than three
+DEVANAGARI = r"\u0900-\u097F\u0981-\u09FF"
+DEVANAGARI_RUN = re.compile(rf"([{DEVANAGARI}]+(?:\s+[{DEVANAGARI}]+)*)")
+
+SECONDARY_LANGUAGE = "hi-IN"
+
+AZURE_NAMESPACES = 'xmlns="http://www.w3.org/2001/10/synthesis" xmlns:mstts="https://www.w3.org/2001/mstts"'
+
+
+def segment_text(text, secondary_language=SECONDARY_LANGUAGE):
+    """Split text into (language, run) pairs in one pass.
+
+    Devanagari runs get secondary_language; everything else gets None, meaning
+    the document's primary language.
+    """
+    parts = DEVANAGARI_RUN.split(text)
+    # split() with one capture group alternates other-script / Devanagari parts
+    return [(secondary_language if k % 2 else None, part) for k, part in enumerate(parts) if part]
+
+
+def tag_languages(text, secondary_language=SECONDARY_LANGUAGE):
+    """Escape text for SSML and wrap each Devanagari run in a <lang> element"""
+    escaped = escape(text)
+    if secondary_language is None:
+        return escaped
+    # Equivalent to joining segment_text(), but done by the regex engine in a single sub()
+    return DEVANAGARI_RUN.sub(f'<lang xml:lang="{secondary_language}">\\1</lang>', escaped)
+
+
+def azure_envelope(voice, language="en-IN"):
+    """Opening and closing tags of an Azure SSML document for one voice"""
+    return (f"<speak version='1.0' {AZURE_NAMESPACES} xml:lang='{language}'><voice name='{voice}'>",
+            "</voice></speak>")
+
+
+def polly_envelope(language="en-US", rate=None):
+    """Opening and closing tags of a Polly SSML document"""
+    head, tail = f'<speak><lang xml:lang="{language}">', "</lang></speak>"
+    if rate and rate != "medium":
+        head, tail = f'<speak><prosody rate="{rate}"><lang xml:lang="{language}">', "</lang></prosody></speak>"
+    return head, tail
+
+
+def build_azure_ssml(text, voice, language="en-IN", secondary_language=SECONDARY_LANGUAGE):
+    head, tail = azure_envelope(voice, language)
+    return head + tag_languages(text, secondary_language) + tail
+
+
+def build_polly_ssml(text, language="en-US", rate=None, secondary_language=None):
+    head, tail = polly_envelope(language, rate)
+    return head + tag_languages(text, secondary_language) + tail
+
+
+def build_azure_ssml_batch(texts, voice, language="en-IN", secondary_language=SECONDARY_LANGUAGE):
+    """build_azure_ssml() for a whole corpus, formatting the envelope once"""
+    head, tail = azure_envelope(voice, language)
+    return [head + tag_languages(text, secondary_language) + tail for text in texts]
+
+
+def build_polly_ssml_batch(texts, language="en-US", rate=None, secondary_language=None):
+    """build_polly_ssml() for a whole corpus, formatting the envelope once"""
+    head, tail = polly_envelope(language, rate)
+    return [head + tag_languages(text, secondary_language) + tail for text in texts]
+
+
+def marked_body(texts, mark_tag, pause_ms, secondary_language=None):
+    """Several lines in one SSML body, each preceded by a mark in the middle of a pause.
+
+    mark_tag is a format string such as '<mark name="{}"/>'; marks are named line0, line1, ...
+    """
+    half_pause = f'<break time="{pause_ms // 2}ms"/>'
+    return half_pause.join(
+        mark_tag.format(f"line{k}") + ("" if k == 0 else half_pause) + tag_languages(text, secondary_language)
+        for k, text in enumerate(texts)
+    )
+
+
+def build_polly_marked_ssml(texts, pause_ms, language="en-US", secondary_language=None):
+    """Polly SSML for several lines with a <mark> before each one"""
+    head, tail = polly_envelope(language)
+    return head + marked_body(texts, '<mark name="{}"/>', pause_ms, secondary_language) + tail
+
+
+def build_azure_marked_ssml(texts, voice, pause_ms, language="en-IN", secondary_language=None):
+    """Azure SSML for several lines with a <bookmark> before each one"""
+    head, tail = azure_envelope(voice, language)
+    return head + marked_body(texts, '<bookmark mark="{}"/>', pause_ms, secondary_language) + tail
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write one SSML document per line of a text file')
+    parser.add_argument('--input-file', type=str, default='text.txt', help='Input text file path')
+    parser.add_argument('--output-file', type=str, default='text.ssml.txt', help='Output file, one SSML document per line')
+    parser.add_argument('--provider', choices=['azure', 'polly'], default='azure', help='SSML dialect to emit')
+    parser.add_argument('--voice', type=str, default='hi-IN-SwaraNeural', help='Azure voice name')
+    parser.add_argument('--language', type=str, default='en-IN', help='Primary language of the documents')
+
+    args = parser.parse_args()
+    with open(args.input_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if args.provider == 'azure':
+        documents = build_azure_ssml_batch(lines, args.voice, args.language)
+    else:
+        documents = build_polly_ssml_batch(lines, args.language, secondary_language=SECONDARY_LANGUAGE)
+    with open(args.output_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(documents) + "\n")
+    print(f"Wrote {len(documents)} SSML documents to {args.output_file}")
@@ -0,0 +1,116 @@
+import json
+import math
+import argparse
+import threading
+from datetime import datetime
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class MetricsRecorder:
+    """Appends one JSON record per synthesis call to a JSONL metrics file.
+
+    Each record carries the run id, line, service, outcome, request characters,
+    response bytes, queue wait, time to first byte, latency and retries.
+    """
+
+    def __init__(self, path="tts_metrics.jsonl", run_id=None):
+        self.path = path
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.records = []
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, **fields):
+        record = {"run_id": self.run_id, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.records.append(record)
+            self._file.write(line)
+            self._file.flush()
+
+    def summary(self):
+        with self._lock:
+            return summarize(self.records)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def summarize(records):
+    """Per-service call counts, latency percentiles and throughput"""
+    by_service = {}
+    for record in records:
+        by_service.setdefault(record["service"], []).append(record)
+
+    summary = {}
+    for service, calls in by_service.items():
+        ok = [c for c in calls if c["outcome"] == "ok"]
+        latencies = sorted(c["latency"] for c in ok)
+        ttfbs = sorted(c["ttfb"] for c in ok if c.get("ttfb") is not None)
+        waits = sorted(c["queue_wait"] for c in ok if c.get("queue_wait") is not None)
+        busy = sum(latencies)
+        summary[service] = {
+            "calls": len(calls),
+            "ok": len(ok),
+            "failed": sum(1 for c in calls if c["outcome"] == "failed"),
+            "cached": sum(1 for c in calls if c["outcome"] == "cached"),
+            "retries": sum(c.get("retries", 0) for c in calls),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "ttfb_p50": percentile(ttfbs, 50),
+            "queue_wait_p50": percentile(waits, 50),
+            "queue_wait_p95": percentile(waits, 95),
+            "chars_per_second": sum(c["chars"] for c in ok) / busy if busy else None,
+            "bytes": sum(c.get("bytes") or 0 for c in ok),
+        }
+    return summary
+
+
+def _fmt(seconds):
+    return f"{seconds:.2f}s" if seconds is not None else "-"
+
+
+def print_summary(summary):
+    """Print the per-service table produced by summarize()"""
+    if not summary:
+        print("No synthesis calls recorded")
+        return
+    print(f"\n{'service':<11} {'calls':>6} {'ok':>6} {'failed':>6} {'cached':>6} {'retries':>7} "
+          f"{'p50':>7} {'p95':>7} {'p99':>7} {'ttfb50':>7} {'wait95':>7} {'chars/s':>8}")
+    for service, s in summary.items():
+        chars_per_second = f"{s['chars_per_second']:.0f}" if s["chars_per_second"] is not None else "-"
+        print(f"{service:<11} {s['calls']:>6} {s['ok']:>6} {s['failed']:>6} {s['cached']:>6} {s['retries']:>7} "
+              f"{_fmt(s['latency_p50']):>7} {_fmt(s['latency_p95']):>7} {_fmt(s['latency_p99']):>7} "
+              f"{_fmt(s['ttfb_p50']):>7} {_fmt(s['queue_wait_p95']):>7} {chars_per_second:>8}")
+
+
+def load_records(path="tts_metrics.jsonl", run_id=None):
+    """Read a metrics file, keeping only one run (the latest when run_id is None)"""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            try:
+                records.append(json.loads(raw))
+            except json.JSONDecodeError:
+                continue
+    if run_id is None and records:
+        run_id = records[-1]["run_id"]
+    return [r for r in records if r["run_id"] == run_id]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize synthesis telemetry written by tts.py')
+    parser.add_argument('--metrics-file', type=str, default='tts_metrics.jsonl', help='Metrics JSONL file')
+    parser.add_argument('--run-id', type=str, help='Run to summarize (defaults to the latest run)')
+
+    args = parser.parse_args()
+    print_summary(summarize(load_records(args.metrics_file, args.run_id)))
@@ -0,0 +1,24 @@
+import json
+
+from adaptive_sampler import get_sampler
+from ratings_store import get_ratings_store
+
+
+def write_metadata(path, count):
+    entries = [{"id": str(i), "text": f"line {i}", f"audios_{i}": {"audio1": 1, "audio2": 2, "audio3": 3, "audio4": 4}}
+               for i in range(1, count + 1)]
+    path.write_text(json.dumps(entries), encoding="utf-8")
+
+
+def test_replaced_sampler_is_unsubscribed(tmp_path):
+    metadata = tmp_path / "metadata.json"
+    log_path = str(tmp_path / "ratings.jsonl")
+    write_metadata(metadata, 3)
+    first = get_sampler(str(metadata), log_path)
+    write_metadata(metadata, 4)
+    second = get_sampler(str(metadata), log_path)
+
+    listeners = get_ratings_store(log_path)._listeners
+    assert second is not first
+    assert first.on_append not in listeners
+    assert second.on_append in listeners
@@ -0,0 +1,35 @@
+from ratings_store import RatingsStore, iter_submissions
+
+
+def test_torn_tail_is_cut_before_appending(tmp_path):
+    path = tmp_path / "ratings.jsonl"
+    path.write_bytes(b'{"a": 1}\n{"a": 2, "rat')
+
+    store = RatingsStore(str(path))
+    store.submit({"a": 3})
+    store.submit({"a": 4})
+    store.close()
+
+    assert list(iter_submissions(str(path))) == [{"a": 1}, {"a": 3}, {"a": 4}]
+
+
+def test_log_without_any_newline_is_emptied(tmp_path):
+    path = tmp_path / "ratings.jsonl"
+    path.write_bytes(b'{"a": 1')
+
+    store = RatingsStore(str(path))
+    store.append({"a": 2})
+    store.close()
+
+    assert list(iter_submissions(str(path))) == [{"a": 2}]
+
+
+def test_complete_log_is_left_alone(tmp_path):
+    path = tmp_path / "ratings.jsonl"
+    path.write_bytes(b'{"a": 1}\n')
+
+    store = RatingsStore(str(path))
+    store.append({"a": 2})
+    store.close()
+
+    assert list(iter_submissions(str(path))) == [{"a": 1}, {"a": 2}]
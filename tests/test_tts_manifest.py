@@ -0,0 +1,16 @@
+from tts_manifest import JobManifest, DONE
+
+
+def test_record_after_torn_tail_survives_reload(tmp_path):
+    path = tmp_path / "tts_manifest.jsonl"
+    manifest = JobManifest(str(path))
+    manifest.register([(1, "aws", "hello"), (2, "aws", "world")])
+    manifest.close()
+    with open(path, "ab") as f:
+        f.write(b'{"line": 1, "service": "aws", "sta')
+
+    manifest = JobManifest(str(path))
+    manifest.record(2, "aws", DONE)
+    manifest.close()
+
+    assert JobManifest(str(path)).is_done(2, "aws")
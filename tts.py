@@ -1,16 +1,56 @@
 import os
+import json
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from google.cloud import texttospeech
-import boto3
-import requests
 from botocore.exceptions import BotoCoreError, ClientError
 from contextlib import closing
 import argparse
+from tts_cache import SynthesisCache
+from audio_io import CHUNK_SIZE, write_chunks, stream_response_to_file, stream_body_to_file
+from mp3_frames import split_at_times
+from ssml import build_azure_ssml, build_polly_marked_ssml, build_azure_marked_ssml
+from tts_clients import (get_http_session, get_google_client, get_polly_client, get_azure_token_cache,
+                         get_azure_synthesizer, close_clients)
+from rate_limiter import ProviderRateLimiter, is_throttle_error
+from telemetry import MetricsRecorder, print_summary
+from tts_retry import RetryPolicy, CircuitBreaker, CircuitOpenError, is_retryable_error, retry_after_seconds
+from tts_manifest import JobManifest, PENDING as JOB_PENDING, DONE as JOB_DONE, FAILED as JOB_FAILED
 
 # Load environment variables
 load_dotenv()
 
+# Voice, model and output format used for each service; these also key the synthesis cache
+PROVIDER_SETTINGS = {
+    "elevenlabs": {
+        "voice": "mfMM3ijQgz8QtMeKifko",  # Using a predefined voice ID
+        "model": "eleven_turbo_v2_5",
+        "format": "audio/mpeg",
+        "voice_settings": {
+            "stability": 0.5,
+            "similarity_boost": 0.5
+        }
+    },
+    "google": {
+        "voice": "en-IN-Neural2-D",
+        "language": "en-IN",
+        "format": "MP3"
+    },
+    "aws": {
+        "voice": "Kajal",
+        "engine": "neural",
+        "language": "en-IN",
+        "format": "mp3"
+    },
+    "azure": {
+        "voice": "hi-IN-SwaraNeural",
+        "language": "en-IN",
+        "format": "audio-16khz-32kbitrate-mono-mp3"
+    }
+}
+
 def create_directory_structure(base_dir="audios"):
     """Create the directory structure for audio outputs"""
     if not os.path.exists(base_dir):
@@ -24,38 +64,189 @@ def create_audio_subdirectory(base_dir, index):
         os.makedirs(subdir)
     return subdir
 
-def generate_elevenlabs_audio(text, output_file):
-    """Generate audio using ElevenLabs"""
+def synthesize_elevenlabs(text, output_file, on_first_byte=None):
+    """Synthesize text with ElevenLabs, raising on any error"""
+    settings = PROVIDER_SETTINGS["elevenlabs"]
     api_key = os.getenv("ELEVENLABS_API_KEY")
     base_url = "https://api.elevenlabs.io/v1"
     headers = {
-        "Accept": "audio/mpeg",
+        "Accept": settings["format"],
         "Content-Type": "application/json",
         "xi-api-key": api_key
     }
 
-    selected_voice = "mfMM3ijQgz8QtMeKifko"  # Using a predefined voice ID
+    selected_voice = settings["voice"]
 
     payload = {
         "text": text,
-        "model_id": "eleven_turbo_v2_5",
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.5
-        }
+        "model_id": settings["model"],
+        "voice_settings": settings["voice_settings"]
     }
 
-    try:
-        tts_response = requests.post(
-            f"{base_url}/text-to-speech/{selected_voice}",
-            json=payload,
-            headers=headers
-        )
+    with get_http_session("elevenlabs").post(
+        f"{base_url}/text-to-speech/{selected_voice}",
+        json=payload,
+        headers=headers,
+        stream=True
+    ) as tts_response:
+        tts_response.raise_for_status()
+        stream_response_to_file(tts_response, output_file, on_first_byte)
+
+def synthesize_google(text, output_file, on_first_byte=None):
+    """Synthesize text with Google Cloud TTS, raising on any error"""
+    settings = PROVIDER_SETTINGS["google"]
+    credentials_path = os.path.join(os.getcwd(), "google-creds.json")
+    client = get_google_client(credentials_path)
+    input_text = texttospeech.SynthesisInput(text=text)
+    
+    voice = texttospeech.VoiceSelectionParams(
+        language_code=settings["language"],
+        name=settings["voice"],
+    )
+    
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding[settings["format"]]
+    )
+    
+    response = client.synthesize_speech(
+        request={"input": input_text, "voice": voice, "audio_config": audio_config}
+    )
+    
+    # The unary API returns the whole clip at once; still write it atomically
+    write_chunks([response.audio_content], output_file, on_first_byte)
+
+def synthesize_aws(text, output_file, on_first_byte=None):
+    """Synthesize text with AWS Polly, raising on any error"""
+    settings = PROVIDER_SETTINGS["aws"]
+    polly_client = get_polly_client(
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name='us-east-1'
+    )
+
+    response = polly_client.synthesize_speech(
+        Engine=settings["engine"],
+        Text=text,
+        OutputFormat=settings["format"],
+        VoiceId=settings["voice"]
+    )
+
+    if "AudioStream" not in response:
+        raise RuntimeError("Polly response contained no AudioStream")
+    with closing(response["AudioStream"]) as stream:
+        stream_body_to_file(stream, output_file, on_first_byte)
+
+def synthesize_azure(text, output_file, on_first_byte=None):
+    """Synthesize text with Azure TTS, raising on any error"""
+    settings = PROVIDER_SETTINGS["azure"]
+    subscription_key = os.getenv("AZURE_SPEECH_KEY")
+    region = "eastus2"
+
+    # Get access token (cached and refreshed ahead of expiry)
+    token_cache = get_azure_token_cache(subscription_key, region)
+    access_token = token_cache.get_token()
+
+    # Generate speech
+    tts_url = f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
+    headers = {
+        'Authorization': f'Bearer {access_token}',
+        'Content-Type': 'application/ssml+xml',
+        'X-Microsoft-OutputFormat': settings["format"],
+        'User-Agent': 'azure-tts-sample'
+    }
+
+    ssml = build_azure_ssml(text, settings["voice"], settings["language"], secondary_language=None)
+
+    session = get_http_session("azure")
+    response = session.post(tts_url, headers=headers, data=ssml.encode('utf-8'), stream=True)
+    if response.status_code == 401:
+        # Token revoked or expired early: refresh once and retry
+        response.close()
+        access_token = token_cache.force_refresh(access_token)
+        headers['Authorization'] = f'Bearer {access_token}'
+        response = session.post(tts_url, headers=headers, data=ssml.encode('utf-8'), stream=True)
+    with response:
+        response.raise_for_status()
+        stream_response_to_file(response, output_file, on_first_byte)
+
+# Silence inserted between batched lines; each line's mark sits in the middle of it,
+# so the audio is split inside the pause
+BATCH_PAUSE_MS = 600
+
+# Polly bills at most 3000 characters per request; keep batches well under both providers' limits
+MAX_BATCH_CHARS = 2500
+
+def write_batch_audio(data, offsets, output_files):
+    """Split a batch's MP3 at each line's mark offset (in seconds) and write one file per line"""
+    missing = [k for k, offset in enumerate(offsets) if offset is None]
+    if missing:
+        raise ValueError(f"No mark timing returned for batched lines {missing}")
+    segments = split_at_times(data, offsets[1:])
+    if not all(segments):
+        raise ValueError("Batch audio split produced an empty segment")
+    for segment, output_file in zip(segments, output_files):
+        write_chunks([segment], output_file)
+
+def synthesize_aws_batch(texts, output_files, on_first_byte=None):
+    """Synthesize several lines with Polly and split the audio at their SSML speech marks
+
+    Costs two requests per batch: one for the speech marks, one for the audio.
+    """
+    settings = PROVIDER_SETTINGS["aws"]
+    polly_client = get_polly_client(
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name='us-east-1'
+    )
+    request = {
+        "Engine": settings["engine"],
+        # Same language as Kajal's default for the plain-text single-line requests
+        "Text": build_polly_marked_ssml(texts, BATCH_PAUSE_MS, settings["language"]),
+        "TextType": "ssml",
+        "VoiceId": settings["voice"]
+    }
+
+    marks_response = polly_client.synthesize_speech(OutputFormat="json", SpeechMarkTypes=["ssml"], **request)
+    with closing(marks_response["AudioStream"]) as stream:
+        marks = [json.loads(raw) for raw in stream.read().decode("utf-8").splitlines() if raw.strip()]
+    times = {mark["value"]: mark["time"] / 1000 for mark in marks if mark.get("type") == "ssml"}
+
+    response = polly_client.synthesize_speech(OutputFormat=settings["format"], **request)
+    if "AudioStream" not in response:
+        raise RuntimeError("Polly response contained no AudioStream")
+    with closing(response["AudioStream"]) as stream:
+        chunks = []
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            if not chunks and on_first_byte is not None:
+                on_first_byte()
+            chunks.append(chunk)
+
+    write_batch_audio(b"".join(chunks), [times.get(f"line{k}") for k in range(len(texts))], output_files)
+
+def synthesize_azure_batch(texts, output_files, on_first_byte=None):
+    """Synthesize several lines with Azure and split the audio at their bookmarks
+
+    The REST endpoint used by synthesize_azure does not report bookmark offsets,
+    so batches go through the Speech SDK (azure-cognitiveservices-speech), on a
+    synthesizer each worker thread keeps across batches.
+    """
+    import azure.cognitiveservices.speech as speechsdk
 
-        if tts_response.status_code == 200:
-            with open(output_file, "wb") as f:
-                f.write(tts_response.content)
-            return True
+    settings = PROVIDER_SETTINGS["azure"]
+    synthesizer = get_azure_synthesizer(os.getenv("AZURE_SPEECH_KEY"), "eastus2", settings["format"])
+    ssml = build_azure_marked_ssml(texts, settings["voice"], BATCH_PAUSE_MS, settings["language"])
+    result, times = synthesizer.speak_ssml(ssml, on_first_byte)
+    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        details = result.cancellation_details
+        raise RuntimeError(f"Azure batch synthesis canceled: {details.reason} {details.error_details}")
+
+    write_batch_audio(result.audio_data, [times.get(f"line{k}") for k in range(len(texts))], output_files)
+
+def generate_elevenlabs_audio(text, output_file):
+    """Generate audio using ElevenLabs"""
+    try:
+        synthesize_elevenlabs(text, output_file)
+        return True
     except Exception as e:
         print(f"ElevenLabs TTS error: {str(e)}")
     return False
@@ -63,53 +254,17 @@ def generate_elevenlabs_audio(text, output_file):
 def generate_google_audio(text, output_file):
     """Generate audio using Google Cloud TTS"""
     try:
-        credentials_path = os.path.join(os.getcwd(), "google-creds.json")
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-        
-        client = texttospeech.TextToSpeechClient()
-        input_text = texttospeech.SynthesisInput(text=text)
-        
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-IN",
-            name="en-IN-Neural2-D",
-        )
-        
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
-        )
-        
-        response = client.synthesize_speech(
-            request={"input": input_text, "voice": voice, "audio_config": audio_config}
-        )
-        
-        with open(output_file, "wb") as out:
-            out.write(response.audio_content)
+        synthesize_google(text, output_file)
         return True
     except Exception as e:
         print(f"Google TTS error: {str(e)}")
-        return False
+    return False
 
 def generate_aws_audio(text, output_file):
     """Generate audio using AWS Polly"""
     try:
-        polly_client = boto3.Session(
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            region_name='us-east-1'
-        ).client('polly')
-
-        response = polly_client.synthesize_speech(
-            Engine="neural",
-            Text=text,
-            OutputFormat="mp3",
-            VoiceId="Kajal"
-        )
-
-        if "AudioStream" in response:
-            with closing(response["AudioStream"]) as stream:
-                with open(output_file, "wb") as file:
-                    file.write(stream.read())
-            return True
+        synthesize_aws(text, output_file)
+        return True
     except Exception as e:
         print(f"AWS Polly error: {str(e)}")
     return False
@@ -117,92 +272,631 @@ def generate_aws_audio(text, output_file):
 def generate_azure_audio(text, output_file):
     """Generate audio using Azure TTS"""
     try:
-        subscription_key = os.getenv("AZURE_SPEECH_KEY")
-        region = "eastus2"
-
-        # Get access token
-        fetch_token_url = f"https://{region}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
-        headers = {
-            'Ocp-Apim-Subscription-Key': subscription_key,
-            'Content-type': 'application/x-www-form-urlencoded',
-            'Content-Length': '0'
-        }
-        response = requests.post(fetch_token_url, headers=headers)
-        access_token = response.text
-
-        # Generate speech
-        tts_url = f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/ssml+xml',
-            'X-Microsoft-OutputFormat': 'audio-16khz-32kbitrate-mono-mp3',
-            'User-Agent': 'azure-tts-sample'
-        }
-
-        ssml = f"""
-        <speak version='1.0' xmlns="http://www.w3.org/2001/10/synthesis" xmlns:mstts="https://www.w3.org/2001/mstts" xml:lang='en-IN'>
-            <voice name='hi-IN-SwaraNeural'>
-                {text}
-            </voice>
-        </speak>
-        """
-
-        response = requests.post(tts_url, headers=headers, data=ssml.encode('utf-8'))
-        
-        if response.status_code == 200:
-            with open(output_file, 'wb') as audio:
-                audio.write(response.content)
-            return True
+        synthesize_azure(text, output_file)
+        return True
     except Exception as e:
         print(f"Azure TTS error: {str(e)}")
     return False
 
-def process_text_file(input_file="text.txt", start_line=1):
+# Synthesize audio using each service
+SERVICES = {
+    "elevenlabs": (synthesize_elevenlabs, "audio1.mp3"),
+    "google": (synthesize_google, "audio2.mp3"),
+    "aws": (synthesize_aws, "audio3.mp3"),
+    "azure": (synthesize_azure, "audio4.mp3")
+}
+
+# Services that report mark timings and can synthesize many lines per request (--batch-size)
+BATCH_SERVICES = {
+    "aws": synthesize_aws_batch,
+    "azure": synthesize_azure_batch
+}
+
+# Provider requests per batch: Polly needs one for the speech marks and one for the audio
+BATCH_REQUESTS = {"aws": 2}
+
+# Maximum number of in-flight requests per service in concurrent mode
+DEFAULT_CONCURRENCY = {
+    "elevenlabs": 2,
+    "google": 8,
+    "aws": 8,
+    "azure": 4
+}
+
+# Request and character quotas per service; override with --rate-limits
+DEFAULT_RATE_LIMITS = {
+    "elevenlabs": {"requests_per_second": 2, "chars_per_minute": 20000},
+    "google": {"requests_per_second": 15, "chars_per_minute": 300000},
+    "aws": {"requests_per_second": 8, "chars_per_minute": 300000},
+    "azure": {"requests_per_second": 10, "chars_per_minute": 200000}
+}
+
+# Shared by every worker thread; populated by configure_rate_limits()
+RATE_LIMITERS = {}
+
+def configure_rate_limits(overrides=None):
+    """Create one shared rate limiter per service from the defaults plus any overrides"""
+    for service_name in SERVICES:
+        limits = {**DEFAULT_RATE_LIMITS[service_name], **(overrides or {}).get(service_name, {})}
+        RATE_LIMITERS[service_name] = ProviderRateLimiter(**limits)
+    return RATE_LIMITERS
+
+def load_rate_limits(path):
+    """Load per-service rate limit overrides from a JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(SERVICES)
+    if unknown:
+        raise ValueError(f"Unknown services in rate limit config: {', '.join(sorted(unknown))}")
+    return overrides
+
+# Backoff settings per service; each service also gets its own circuit breaker
+DEFAULT_RETRY_POLICIES = {
+    "elevenlabs": {"max_attempts": 4, "base_delay": 2.0, "max_delay": 60.0},
+    "google": {"max_attempts": 4, "base_delay": 1.0, "max_delay": 30.0},
+    "aws": {"max_attempts": 4, "base_delay": 1.0, "max_delay": 30.0},
+    "azure": {"max_attempts": 4, "base_delay": 1.0, "max_delay": 30.0}
+}
+
+# Jobs deferred by an open circuit are marked failed after waiting this long
+MAX_DEFER_SECONDS = 1800
+
+# Shared by every worker thread; populated by configure_retries()
+RETRY_POLICIES = {}
+CIRCUIT_BREAKERS = {}
+
+def configure_retries(overrides=None):
+    """Create the retry policy and circuit breaker of each service"""
+    for service_name in SERVICES:
+        settings = {**DEFAULT_RETRY_POLICIES[service_name], **(overrides or {}).get(service_name, {})}
+        RETRY_POLICIES[service_name] = RetryPolicy(**settings)
+        CIRCUIT_BREAKERS[service_name] = CircuitBreaker(service_name)
+    return RETRY_POLICIES
+
+def ensure_service_controls():
+    """Fall back to the default rate limits and retry policies if none were configured"""
+    if not RATE_LIMITERS:
+        configure_rate_limits()
+    if not RETRY_POLICIES:
+        configure_retries()
+
+def iter_text_lines(input_file="text.txt", start_line=1):
+    """Yield (line_number, text) for each non-empty line from start_line onwards"""
+    with open(input_file, 'r', encoding='utf-8') as file:
+        for i, line in enumerate(file, 1):
+            if i < start_line:
+                continue
+
+            line = line.strip()
+            if not line:  # Skip empty lines
+                continue
+
+            yield i, line
+
+def cache_settings(service_name, batched=False):
+    """Settings that key the cache; audio cut from a batch is cached apart from single-line audio"""
+    settings = PROVIDER_SETTINGS[service_name]
+    return {**settings, "batched": True} if batched else settings
+
+def fetch_cached_audio(service_name, text, output_file, cache, batched=False):
+    """Place a cached copy of the service's audio at output_file. Returns True on a cache hit."""
+    if cache is None:
+        return False
+    key = cache.make_key(service_name, cache_settings(service_name, batched), text)
+    return cache.fetch(key, output_file)
+
+def call_with_retries(service_name, chars, call, queued_at=None, requests=1):
+    """Run call(on_first_byte) within the service's rate limit, circuit breaker and retry policy
+
+    requests is how many provider requests one call makes, each sending all chars.
+
+    Returns a dict of call stats: success, attempts, queue_wait (from queued_at to the
+    first request), ttfb and latency (of the last attempt).
+    Raises CircuitOpenError, without calling the service, while its circuit breaker is open.
+    """
+    queued_at = queued_at if queued_at is not None else time.monotonic()
+    stats = {"success": False, "attempts": 0, "queue_wait": None, "ttfb": None, "latency": None}
+    first_byte = []
+    limiter = RATE_LIMITERS.get(service_name)
+    policy = RETRY_POLICIES.get(service_name)
+    breaker = CIRCUIT_BREAKERS.get(service_name)
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        if limiter is not None:
+            limiter.acquire(chars * requests, requests)
+        if policy is not None:
+            policy.budget.record_request()
+        attempt += 1
+        sent = time.monotonic()
+        if stats["queue_wait"] is None:
+            stats["queue_wait"] = sent - queued_at
+        first_byte.clear()
+        try:
+            call(on_first_byte=lambda: first_byte.append(time.monotonic()))
+            break
+        except Exception as e:
+            stats["attempts"] = attempt
+            stats["latency"] = time.monotonic() - sent
+            if limiter is not None and is_throttle_error(e):
+                limiter.on_throttle()
+                print(f"{service_name} throttled us; slowing to {limiter.current_rate():.2f} requests/s")
+            if breaker is not None:
+                if is_retryable_error(e):
+                    breaker.record_failure()
+                else:
+                    breaker.release_probe()
+            if policy is not None and policy.should_retry(e, attempt):
+                delay = policy.backoff(attempt, retry_after_seconds(e))
+                print(f"{service_name} error: {str(e)}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            print(f"{service_name} error: {str(e)}")
+            return stats
+    stats.update({
+        "success": True,
+        "attempts": attempt,
+        "ttfb": first_byte[0] - sent if first_byte else None,
+        "latency": time.monotonic() - sent
+    })
+    if limiter is not None:
+        limiter.on_success()
+    if breaker is not None:
+        breaker.record_success()
+    return stats
+
+def generate_service_audio(service_name, text, output_file, cache=None, queued_at=None):
+    """Call the service within its rate limit, retrying transient errors, and cache the result
+
+    Returns the call stats of call_with_retries() plus the response bytes.
+    Raises CircuitOpenError, without calling the service, while its circuit breaker is open.
+    """
+    synthesize_func, _ = SERVICES[service_name]
+    # Synthesizers write to a temp file and rename it into place, so a cache entry
+    # hard-linked to output_file is never written through
+    stats = call_with_retries(
+        service_name,
+        len(text),
+        lambda on_first_byte: synthesize_func(text, output_file, on_first_byte=on_first_byte),
+        queued_at
+    )
+    stats["bytes"] = None
+    if stats["success"]:
+        stats["bytes"] = os.path.getsize(output_file)
+        if cache is not None:
+            cache.store(cache.make_key(service_name, PROVIDER_SETTINGS[service_name], text), output_file)
+    return stats
+
+def print_cache_stats(cache):
+    """Print the synthesis cache hit rate and bytes saved for this run"""
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.1%} hit rate), {stats['bytes_saved'] / 1024 / 1024:.1f} MB saved, "
+          f"{stats['entries']} entries / {stats['size_bytes'] / 1024 / 1024:.1f} MB on disk")
+
+def record_job(manifest, line_number, service_name, output_file, success, started, cached=False, attempts=1):
+    """Record the outcome of one (line, service) job in the manifest"""
+    if manifest is None:
+        return
+    status = JOB_DONE if success else JOB_FAILED
+    manifest.record(line_number, service_name, status, output_file, time.monotonic() - started, cached, attempts)
+
+def record_call(metrics, line_number, service_name, text, stats=None, cached=False, batch_size=None):
+    """Write one synthesis call's telemetry record (one per line, also for batched requests)"""
+    if metrics is None:
+        return
+    stats = stats or {}
+    if cached:
+        outcome = "cached"
+    else:
+        outcome = "ok" if stats.get("success") else "failed"
+    metrics.record(
+        line=line_number,
+        service=service_name,
+        outcome=outcome,
+        chars=len(text),
+        bytes=stats.get("bytes"),
+        queue_wait=stats.get("queue_wait"),
+        ttfb=stats.get("ttfb"),
+        latency=stats.get("latency"),
+        retries=max(0, stats.get("attempts", 0) - 1),
+        batch=batch_size
+    )
+
+def print_metrics_summary(metrics):
+    """Print per-service latency percentiles and throughput for this run"""
+    if metrics is not None:
+        print_summary(metrics.summary())
+
+def register_jobs(manifest, lines):
+    """Add every (line, service) pair of this run to the manifest as pending"""
+    if manifest is not None:
+        manifest.register((i, service_name, line) for i, line in lines for service_name in SERVICES)
+
+def services_to_run(base_dir, i, manifest=None, resume=False, services=None):
+    """Return the (service_name, output_file) pairs of a line that still need generating"""
+    subdir = os.path.join(base_dir, f"audios_{i}")
+    jobs = []
+    for service_name, (_, filename) in SERVICES.items():
+        if services is not None and service_name not in services:
+            continue
+        output_file = os.path.join(subdir, filename)
+        if resume and manifest is not None and manifest.is_done(i, service_name, output_file):
+            continue
+        jobs.append((service_name, output_file))
+    return jobs
+
+def print_manifest_summary(manifest):
+    """Print how many jobs are done, failed or still pending"""
+    if manifest is None:
+        return
+    counts = manifest.summary()
+    print(f"Manifest: {counts[JOB_DONE]} done, {counts[JOB_FAILED]} failed, {counts[JOB_PENDING]} pending")
+
+def run_job(i, line, service_name, output_file, cache=None, manifest=None, metrics=None, announce_deferral=True):
+    """Produce one (line, service) audio in the sequential loop
+
+    Returns False if the job was deferred because the service's circuit is open.
+    """
+    started = time.monotonic()
+    if fetch_cached_audio(service_name, line, output_file, cache):
+        print(f"Using cached {service_name} audio")
+        record_job(manifest, i, service_name, output_file, True, started, cached=True)
+        record_call(metrics, i, service_name, line, cached=True)
+        return True
+    print(f"Generating {service_name} audio...")
+    try:
+        stats = generate_service_audio(service_name, line, output_file, cache)
+    except CircuitOpenError as e:
+        if announce_deferral:
+            print(f"Deferring {service_name} audio for line {i}: {str(e)}")
+        return False
+    success = stats["success"]
+    record_job(manifest, i, service_name, output_file, success, started, attempts=stats["attempts"])
+    record_call(metrics, i, service_name, line, stats)
+    if success:
+        print(f"Successfully generated {service_name} audio")
+    else:
+        print(f"Failed to generate {service_name} audio")
+    return True
+
+def replay_deferred_jobs(deferred, cache=None, manifest=None, metrics=None):
+    """Re-run jobs deferred by open circuits once their breakers let calls through again"""
+    deadline = time.monotonic() + MAX_DEFER_SECONDS
+    while deferred:
+        wait = min(CIRCUIT_BREAKERS[service_name].retry_after() for _, _, service_name, _ in deferred)
+        if time.monotonic() + wait > deadline:
+            for i, _, service_name, output_file in deferred:
+                print(f"Giving up on deferred {service_name} audio for line {i}")
+                record_job(manifest, i, service_name, output_file, False, time.monotonic(), attempts=0)
+            return
+        print(f"\nReplaying {len(deferred)} deferred jobs in {wait:.0f}s...")
+        time.sleep(wait)
+        deferred = [job for job in deferred
+                    if not run_job(*job, cache=cache, manifest=manifest, metrics=metrics, announce_deferral=False)]
+
+def batched_services(batch_size):
+    """Services that run in batched mode for this --batch-size"""
+    return list(BATCH_SERVICES) if batch_size > 1 else []
+
+def batch_jobs(base_dir, lines, service_name, manifest=None, resume=False):
+    """Return the (i, line, output_file) jobs of one service that still need generating"""
+    jobs = []
+    for i, line in lines:
+        for _, output_file in services_to_run(base_dir, i, manifest, resume, services=[service_name]):
+            create_audio_subdirectory(base_dir, i)
+            jobs.append((i, line, output_file))
+    return jobs
+
+def iter_batches(jobs, batch_size, max_chars=MAX_BATCH_CHARS):
+    """Group (i, line, output_file) jobs into batches of at most batch_size lines and max_chars characters"""
+    batch, chars = [], 0
+    for job in jobs:
+        if batch and (len(batch) >= batch_size or chars + len(job[1]) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(job)
+        chars += len(job[1])
+    if batch:
+        yield batch
+
+def run_batch(service_name, batch, cache=None, manifest=None, metrics=None, queued_at=None):
+    """Synthesize one batch of (i, line, output_file) jobs with a single request
+
+    Returns the jobs that still need a request of their own: all of them if the
+    batch failed or the service's circuit is open, otherwise none.
+    """
+    started = time.monotonic()
+    texts = [line for _, line, _ in batch]
+    output_files = [output_file for _, _, output_file in batch]
+    synthesize_batch = BATCH_SERVICES[service_name]
+    total_chars = sum(len(text) for text in texts)
+    label = f"{service_name} batch of lines {batch[0][0]}-{batch[-1][0]}"
+    try:
+        stats = call_with_retries(
+            service_name,
+            total_chars,
+            lambda on_first_byte: synthesize_batch(texts, output_files, on_first_byte=on_first_byte),
+            queued_at,
+            BATCH_REQUESTS.get(service_name, 1)
+        )
+    except CircuitOpenError as e:
+        print(f"Skipping {label}: {str(e)}")
+        return batch
+    if not stats["success"]:
+        print(f"Failed to generate {label}; falling back to one request per line")
+        return batch
+
+    for k, (i, line, output_file) in enumerate(batch):
+        # Apportion the batch latency by characters; retries are counted once, on the first line
+        line_stats = {
+            **stats,
+            "latency": stats["latency"] * len(line) / total_chars,
+            "attempts": stats["attempts"] if k == 0 else 1,
+            "bytes": os.path.getsize(output_file)
+        }
+        record_job(manifest, i, service_name, output_file, True, started, attempts=stats["attempts"])
+        record_call(metrics, i, service_name, line, line_stats, batch_size=len(batch))
+        if cache is not None:
+            cache.store(cache.make_key(service_name, cache_settings(service_name, batched=True), line), output_file)
+    print(f"Successfully generated {label}")
+    return []
+
+def run_batched_service(service_name, jobs, batch_size, cache=None, manifest=None, metrics=None, workers=1):
+    """Generate one service's audio for many lines, batch_size lines per request
+
+    Returns the (i, line, output_file) jobs whose batch failed; the caller runs them line by line.
+    """
+    pending = []
+    for i, line, output_file in jobs:
+        started = time.monotonic()
+        if fetch_cached_audio(service_name, line, output_file, cache, batched=True):
+            record_job(manifest, i, service_name, output_file, True, started, cached=True)
+            record_call(metrics, i, service_name, line, cached=True)
+        else:
+            pending.append((i, line, output_file))
+
+    batches = list(iter_batches(pending, batch_size))
+    if not batches:
+        return []
+    print(f"Generating {service_name} audio for {len(pending)} lines in {len(batches)} batched requests...")
+    queued_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fallbacks = executor.map(
+            lambda batch: run_batch(service_name, batch, cache, manifest, metrics, queued_at), batches
+        )
+        return [job for fallback in fallbacks for job in fallback]
+
+def process_text_file(input_file="text.txt", start_line=1, cache=None, manifest=None, resume=False, metrics=None,
+                      batch_size=1):
     """Process each line in the text file and generate audio using all services
     
     Args:
         input_file (str): Path to the input text file
         start_line (int): Line number to start processing from (1-based indexing)
+        cache (SynthesisCache): Optional cache consulted before calling a service
+        manifest (JobManifest): Optional manifest recording the outcome of every job
+        resume (bool): Only run jobs the manifest does not record as done
+        metrics (MetricsRecorder): Optional recorder of per-call telemetry
+        batch_size (int): Lines per request for the services in BATCH_SERVICES (1 disables batching)
     """
+    ensure_service_controls()
     base_dir = create_directory_structure()
+    lines = list(iter_text_lines(input_file, start_line))
+    register_jobs(manifest, lines)
+    deferred = []
+
+    # Batched services go first; lines whose batch failed are generated one by one below
+    batched = batched_services(batch_size)
+    fallback = set()
+    for service_name in batched:
+        jobs = batch_jobs(base_dir, lines, service_name, manifest, resume)
+        for i, _, _ in run_batched_service(service_name, jobs, batch_size, cache, manifest, metrics):
+            fallback.add((i, service_name))
     
-    with open(input_file, 'r', encoding='utf-8') as file:
-        # Skip lines before start_line
-        for i, line in enumerate(file, 1):
-            if i < start_line:
-                continue
-                
-            line = line.strip()
-            if not line:  # Skip empty lines
-                continue
-                
+    for i, line in lines:
+        jobs = [(service_name, output_file) for service_name, output_file in services_to_run(base_dir, i, manifest, resume)
+                if service_name not in batched or (i, service_name) in fallback]
+        if not jobs:
+            continue
+
+        print(f"\nProcessing line {i}: {line[:50]}...")
+        create_audio_subdirectory(base_dir, i)
+        
+        for service_name, output_file in jobs:
+            if not run_job(i, line, service_name, output_file, cache, manifest, metrics):
+                deferred.append((i, line, service_name, output_file))
+
+    replay_deferred_jobs(deferred, cache, manifest, metrics)
+    print_cache_stats(cache)
+    print_manifest_summary(manifest)
+    print_metrics_summary(metrics)
+
+async def _generate_service_audio(semaphore, service_name, i, line, output_file, cache, manifest, metrics,
+                                  replay=False):
+    """Run one blocking generator call in a worker thread, bounded by the service's semaphore
+
+    Returns None if the job was deferred because the service's circuit is open.
+    """
+    started = time.monotonic()
+    if not replay and await asyncio.to_thread(fetch_cached_audio, service_name, line, output_file, cache):
+        print(f"Using cached {service_name} audio for line {i}")
+        await asyncio.to_thread(record_job, manifest, i, service_name, output_file, True, started, True)
+        record_call(metrics, i, service_name, line, cached=True)
+        return True
+    queued_at = time.monotonic()
+    async with semaphore:
+        print(f"Generating {service_name} audio for line {i}...")
+        started = time.monotonic()
+        try:
+            stats = await asyncio.to_thread(generate_service_audio, service_name, line, output_file, cache, queued_at)
+        except CircuitOpenError as e:
+            if not replay:
+                print(f"Deferring {service_name} audio for line {i}: {str(e)}")
+            return None
+    success = stats["success"]
+    await asyncio.to_thread(record_job, manifest, i, service_name, output_file, success, started, False, stats["attempts"])
+    record_call(metrics, i, service_name, line, stats)
+    if success:
+        print(f"Successfully generated {service_name} audio for line {i}")
+    else:
+        print(f"Failed to generate {service_name} audio for line {i}")
+    return success
+
+async def _replay_deferred_job(semaphore, service_name, i, line, output_file, cache, manifest, metrics):
+    """Wait out an open circuit and replay a deferred job, without holding a line slot"""
+    breaker = CIRCUIT_BREAKERS[service_name]
+    deadline = time.monotonic() + MAX_DEFER_SECONDS
+    while True:
+        wait = breaker.retry_after()
+        if time.monotonic() + wait > deadline:
+            print(f"Giving up on deferred {service_name} audio for line {i}")
+            await asyncio.to_thread(record_job, manifest, i, service_name, output_file, False, time.monotonic(), False, 0)
+            return False
+        await asyncio.sleep(wait)
+        success = await _generate_service_audio(semaphore, service_name, i, line, output_file, cache, manifest,
+                                                metrics, replay=True)
+        if success is not None:
+            return success
+
+async def process_text_file_async(input_file="text.txt", start_line=1, concurrency=None, max_lines_in_flight=64,
+                                  cache=None, manifest=None, resume=False, metrics=None, batch_size=1):
+    """Generate audio for all lines with every service running in parallel
+
+    Each service gets its own concurrency limit, so a run takes roughly as long
+    as the slowest service instead of the sum of all of them.
+
+    Args:
+        input_file (str): Path to the input text file
+        start_line (int): Line number to start processing from (1-based indexing)
+        concurrency (dict): Maximum in-flight requests per service name
+        max_lines_in_flight (int): Maximum number of lines being processed at once
+        cache (SynthesisCache): Optional cache consulted before calling a service
+        manifest (JobManifest): Optional manifest recording the outcome of every job
+        resume (bool): Only run jobs the manifest does not record as done
+        metrics (MetricsRecorder): Optional recorder of per-call telemetry
+        batch_size (int): Lines per request for the services in BATCH_SERVICES (1 disables batching)
+    """
+    limits = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    semaphores = {name: asyncio.Semaphore(limits[name]) for name in SERVICES}
+    line_slots = asyncio.Semaphore(max_lines_in_flight)
+    batched = batched_services(batch_size)
+
+    # The default executor is capped at a few dozen threads; size it to the total service limits
+    # plus headroom for cache lookups, which run outside the per-service limits, and one
+    # thread per batched service driving its own pool of batch requests
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=sum(limits[name] for name in SERVICES) + 4 + len(batched))
+    loop.set_default_executor(executor)
+
+    ensure_service_controls()
+    base_dir = create_directory_structure()
+    lines = list(iter_text_lines(input_file, start_line))
+    register_jobs(manifest, lines)
+    results = {name: 0 for name in SERVICES}
+    deferred_tasks = []
+
+    async def replay(name, i, line, output_file):
+        success = await _replay_deferred_job(semaphores[name], name, i, line, output_file, cache, manifest, metrics)
+        results[name] += int(success)
+
+    async def process_line(i, line, jobs):
+        try:
             print(f"\nProcessing line {i}: {line[:50]}...")
-            subdir = create_audio_subdirectory(base_dir, i)
-            
-            # Generate audio using each service
-            services = {
-                "elevenlabs": (generate_elevenlabs_audio, "audio1.mp3"),
-                "google": (generate_google_audio, "audio2.mp3"),
-                "aws": (generate_aws_audio, "audio3.mp3"),
-                "azure": (generate_azure_audio, "audio4.mp3")
-            }
-            
-            for service_name, (generator_func, filename) in services.items():
-                output_file = os.path.join(subdir, filename)
-                print(f"Generating {service_name} audio...")
-                success = generator_func(line, output_file)
-                if success:
-                    print(f"Successfully generated {service_name} audio")
+            create_audio_subdirectory(base_dir, i)
+            outcomes = await asyncio.gather(*(
+                _generate_service_audio(semaphores[name], name, i, line, output_file, cache, manifest, metrics)
+                for name, output_file in jobs
+            ))
+            for (name, output_file), success in zip(jobs, outcomes):
+                if success is None:
+                    # Circuit open: replay later so this line's slot frees up for the other services
+                    deferred_tasks.append(asyncio.create_task(replay(name, i, line, output_file)))
                 else:
-                    print(f"Failed to generate {service_name} audio")
-                
-                # Add a small delay between API calls
-                time.sleep(1)
+                    results[name] += int(success)
+        finally:
+            line_slots.release()
+
+    async def run_lines(line_jobs):
+        tasks = []
+        for i, line, jobs in line_jobs:
+            if not jobs:
+                continue
+            await line_slots.acquire()
+            tasks.append(asyncio.create_task(process_line(i, line, jobs)))
+        await asyncio.gather(*tasks)
+
+    async def run_batched(name):
+        jobs = batch_jobs(base_dir, lines, name, manifest, resume)
+        fallback = await asyncio.to_thread(run_batched_service, name, jobs, batch_size, cache, manifest, metrics,
+                                           limits[name])
+        results[name] += len(jobs) - len(fallback)
+        return fallback
+
+    # Batched services run alongside the per-line jobs of the others; lines whose
+    # batch failed are then generated one by one
+    batch_runs = asyncio.gather(*(run_batched(name) for name in batched))
+    await run_lines((i, line, services_to_run(base_dir, i, manifest, resume, [n for n in SERVICES if n not in batched]))
+                    for i, line in lines)
+    fallback_jobs = {}
+    for name, fallback in zip(batched, await batch_runs):
+        for i, line, output_file in fallback:
+            fallback_jobs.setdefault((i, line), []).append((name, output_file))
+    await run_lines((i, line, jobs) for (i, line), jobs in sorted(fallback_jobs.items()))
+    if deferred_tasks:
+        print(f"\nWaiting on {len(deferred_tasks)} jobs deferred by open circuits...")
+        await asyncio.gather(*deferred_tasks)
+    executor.shutdown(wait=True)
+
+    print("\nGenerated audio per service: " + ", ".join(f"{name}={count}" for name, count in results.items()))
+    print_cache_stats(cache)
+    print_manifest_summary(manifest)
+    print_metrics_summary(metrics)
+    return results
+
+def parse_concurrency(values):
+    """Parse --concurrency overrides of the form service=N"""
+    concurrency = {}
+    for value in values or []:
+        name, _, limit = value.partition("=")
+        if name not in SERVICES or not limit.isdigit() or int(limit) < 1:
+            raise argparse.ArgumentTypeError(f"Invalid concurrency override: {value}")
+        concurrency[name] = int(limit)
+    return concurrency
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate audio files from text using multiple TTS services')
     parser.add_argument('--start-line', type=int, default=1, help='Line number to start processing from (1-based indexing)')
     parser.add_argument('--input-file', type=str, default='text.txt', help='Input text file path')
+    parser.add_argument('--concurrent', action='store_true', help='Run all services in parallel with many lines in flight')
+    parser.add_argument('--concurrency', nargs='*', metavar='SERVICE=N', help='Per-service in-flight request limits for --concurrent (e.g. google=16 elevenlabs=2)')
+    parser.add_argument('--max-lines-in-flight', type=int, default=64, help='Maximum number of lines processed at once in --concurrent mode')
+    parser.add_argument('--cache-dir', type=str, default='.tts_cache', help='Directory of the synthesis cache')
+    parser.add_argument('--cache-max-mb', type=int, default=2048, help='Size limit of the synthesis cache in MB (least recently used entries are evicted)')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the services, bypassing the synthesis cache')
+    parser.add_argument('--manifest', type=str, default='tts_manifest.jsonl', help='Job manifest recording the status of every (line, service) pair')
+    parser.add_argument('--resume', action='store_true', help='Only re-run (line, service) pairs the manifest records as pending or failed')
+    parser.add_argument('--rate-limits', type=str, help='JSON file overriding per-service requests_per_second / chars_per_minute')
+    parser.add_argument('--metrics-file', type=str, default='tts_metrics.jsonl', help='JSONL file receiving one telemetry record per synthesis call')
+    parser.add_argument('--batch-size', type=int, default=1, help='Pack up to N lines into one SSML request for services that report mark timings (aws, azure) and split the audio at the marks')
     
     args = parser.parse_args()
-    process_text_file(args.input_file, args.start_line) 
\ No newline at end of file
+    configure_rate_limits(load_rate_limits(args.rate_limits) if args.rate_limits else None)
+    cache = None if args.no_cache else SynthesisCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    manifest = JobManifest(args.manifest)
+    metrics = MetricsRecorder(args.metrics_file)
+    if args.concurrent:
+        try:
+            concurrency = parse_concurrency(args.concurrency)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        asyncio.run(process_text_file_async(args.input_file, args.start_line, concurrency, args.max_lines_in_flight,
+                                            cache, manifest, args.resume, metrics, args.batch_size))
+    else:
+        process_text_file(args.input_file, args.start_line, cache, manifest, args.resume, metrics, args.batch_size)
+    manifest.close()
+    metrics.close()
+    close_clients()
@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+
+# Process-wide provider clients, created on first use and reused for the whole run.
+# The provider SDKs are imported lazily so each standalone script only needs its own.
+_clients = {}
+_lock = threading.Lock()
+
+DEFAULT_POOL_SIZE = 32
+
+
+def _get_or_create(key, factory):
+    """Return the client stored under key, creating it exactly once across threads"""
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def get_http_session(name, pool_size=DEFAULT_POOL_SIZE):
+    """Shared keep-alive requests.Session for one HTTP provider (e.g. "elevenlabs", "azure").
+
+    The connection pool is sized for pool_size concurrent workers so requests
+    reuse TLS connections instead of reconnecting for every audio.
+    """
+    def factory():
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return _get_or_create(("http", name), factory)
+
+
+def get_google_client(credentials_path=None):
+    """Shared Google Cloud TextToSpeechClient (thread-safe gRPC channel)"""
+    def factory():
+        from google.cloud import texttospeech
+
+        if credentials_path:
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+        return texttospeech.TextToSpeechClient()
+
+    return _get_or_create(("google", credentials_path), factory)
+
+
+def get_polly_client(aws_access_key_id=None, aws_secret_access_key=None, region_name="us-east-1",
+                     pool_size=DEFAULT_POOL_SIZE):
+    """Shared AWS Polly client. boto3 clients are thread-safe; sessions are not, so the
+    session is only used here, under the registry lock."""
+    def factory():
+        import boto3
+        from botocore.config import Config
+
+        session = boto3.Session(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            region_name=region_name
+        )
+        return session.client("polly", config=Config(max_pool_connections=pool_size))
+
+    return _get_or_create(("polly", aws_access_key_id, region_name), factory)
+
+
+class AzureTokenCache:
+    """Caches an Azure Speech bearer token for its validity window.
+
+    Tokens from issueToken are valid for 10 minutes. Callers get the cached
+    token; once it is within refresh_margin of expiry a background thread
+    fetches the next one, so workers never wait on issueToken in steady state.
+    Concurrent callers share a single fetch.
+    """
+
+    def __init__(self, subscription_key, region, ttl=540, refresh_margin=60):
+        self.subscription_key = subscription_key
+        self.region = region
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires = 0.0
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self):
+        fetch_token_url = f"https://{self.region}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
+        headers = {
+            'Ocp-Apim-Subscription-Key': self.subscription_key,
+            'Content-type': 'application/x-www-form-urlencoded',
+            'Content-Length': '0'
+        }
+        response = get_http_session("azure").post(fetch_token_url, headers=headers)
+        response.raise_for_status()
+        return response.text
+
+    def _refresh(self, stale_token):
+        """Fetch a new token unless another caller already replaced stale_token"""
+        with self._refresh_lock:
+            if self._token is not None and self._token != stale_token and time.monotonic() < self._expires:
+                return self._token
+            token = self._fetch()
+            self._token, self._expires = token, time.monotonic() + self.ttl
+            return token
+
+    def _refresh_in_background(self, stale_token):
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self._refresh(stale_token)
+            except Exception as e:
+                # The current token is still valid; the next caller retries
+                print(f"Azure token refresh error: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_token(self):
+        """Return a valid bearer token, fetching one only when none is usable"""
+        token, expires = self._token, self._expires
+        now = time.monotonic()
+        if token is not None and now < expires:
+            if now >= expires - self.refresh_margin:
+                self._refresh_in_background(token)
+            return token
+        return self._refresh(token)
+
+    def force_refresh(self, stale_token):
+        """Replace a token the service rejected (HTTP 401). Concurrent callers holding the
+        same stale token trigger exactly one fetch."""
+        return self._refresh(stale_token)
+
+
+def get_azure_token_cache(subscription_key, region):
+    """Shared token cache for one Azure Speech resource"""
+    return _get_or_create(("azure-token", subscription_key, region),
+                          lambda: AzureTokenCache(subscription_key, region))
+
+
+class AzureSynthesizer:
+    """A Speech SDK SpeechSynthesizer kept open across calls, reporting each call's bookmarks.
+
+    The SDK event handlers are connected once and write into the state of the
+    call in progress; calls on one instance are serialized by a lock.
+    """
+
+    def __init__(self, subscription_key, region, output_format):
+        import azure.cognitiveservices.speech as speechsdk
+
+        speech_config = speechsdk.SpeechConfig(subscription=subscription_key, region=region)
+        speech_config.set_property(speechsdk.PropertyId.SpeechServiceConnection_SynthOutputFormat, output_format)
+        self._synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        self._lock = threading.Lock()
+        self._bookmarks = {}
+        self._on_first_byte = None
+        self._synthesizer.bookmark_reached.connect(self._on_bookmark)
+        self._synthesizer.synthesizing.connect(self._on_synthesizing)
+
+    def _on_bookmark(self, evt):
+        # audio_offset is in 100-nanosecond ticks
+        self._bookmarks[evt.text] = evt.audio_offset / 10_000_000
+
+    def _on_synthesizing(self, evt):
+        callback, self._on_first_byte = self._on_first_byte, None
+        if callback is not None:
+            callback()
+
+    def speak_ssml(self, ssml, on_first_byte=None):
+        """Synthesize ssml. Returns the SDK result and {bookmark: audio offset in seconds}"""
+        with self._lock:
+            self._bookmarks, self._on_first_byte = {}, on_first_byte
+            try:
+                result = self._synthesizer.speak_ssml_async(ssml).get()
+            finally:
+                self._on_first_byte = None
+            return result, self._bookmarks
+
+
+def get_azure_synthesizer(subscription_key, region, output_format):
+    """Shared AzureSynthesizer for the calling thread, so each worker reuses one connection"""
+    return _get_or_create(("azure-synthesizer", subscription_key, region, output_format, threading.get_ident()),
+                          lambda: AzureSynthesizer(subscription_key, region, output_format))
+
+
+def close_clients():
+    """Close pooled HTTP sessions and forget every client"""
+    with _lock:
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+        _clients.clear()
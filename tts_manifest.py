@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from audio_io import set_default_mode, truncate_torn_tail
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def text_hash(text):
+    """Short hash of a line's text, used to notice edits to text.txt between runs"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class JobManifest:
+    """Durable status of every (line, service) generation job.
+
+    The manifest is an append-only JSONL journal: every update is one record
+    written with a single append and fsync, so a crash can at worst lose a
+    torn final line, which is cut off on load. The latest record for a job
+    wins, and the journal is compacted (rewritten and atomically renamed)
+    when superseded records pile up.
+    """
+
+    def __init__(self, path="tts_manifest.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        # A torn last line from a crash would swallow the next appended record
+        truncate_torn_tail(self.path)
+        records = self._load()
+        if records > 2 * len(self._jobs) + 1000:
+            self._rewrite()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        """Replay the journal into memory. Returns the number of records read."""
+        if not os.path.exists(self.path):
+            return 0
+        records = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue  # torn write from an interrupted run
+                self._jobs[(record["line"], record["service"])] = record
+                records += 1
+        return records
+
+    def _rewrite(self):
+        """Write only the live records to a temp file and atomically replace the journal"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in self._jobs.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def _append(self, records):
+        self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def register(self, jobs):
+        """Add (line, service, text) jobs as pending, resetting any whose text changed"""
+        with self._lock:
+            new_records = []
+            for line, service, text in jobs:
+                digest = text_hash(text)
+                current = self._jobs.get((line, service))
+                if current is not None and current.get("text_hash") == digest:
+                    continue
+                record = {
+                    "line": line,
+                    "service": service,
+                    "text_hash": digest,
+                    "status": PENDING,
+                    "attempts": 0,
+                    "bytes": None,
+                    "latency": None,
+                    "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                self._jobs[(line, service)] = record
+                new_records.append(record)
+            if new_records:
+                self._append(new_records)
+
+    def record(self, line, service, status, output_file=None, latency=None, cached=False, attempts=1):
+        """Record the outcome of a job and the number of provider calls it took"""
+        size = os.path.getsize(output_file) if status == DONE and output_file else None
+        with self._lock:
+            record = dict(self._jobs.get((line, service), {"line": line, "service": service, "attempts": 0}))
+            record.update({
+                "status": status,
+                "attempts": record.get("attempts", 0) + (0 if cached else attempts),
+                "bytes": size,
+                "latency": round(latency, 3) if latency is not None else None,
+                "cached": cached,
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            self._jobs[(line, service)] = record
+            self._append([record])
+
+    def is_done(self, line, service, output_file=None):
+        """True if the job succeeded and (when given) its output file still exists"""
+        with self._lock:
+            record = self._jobs.get((line, service))
+        if record is None or record["status"] != DONE:
+            return False
+        return output_file is None or os.path.exists(output_file)
+
+    def summary(self):
+        """Count jobs by status"""
+        with self._lock:
+            counts = {PENDING: 0, DONE: 0, FAILED: 0}
+            for record in self._jobs.values():
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+            return counts
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,192 @@
+import time
+import random
+import threading
+
+from rate_limiter import is_throttle_error
+
+# Exception class names that indicate a transient network or server problem
+TRANSIENT_EXCEPTION_NAMES = {
+    "ConnectionError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "Timeout",
+    "ChunkedEncodingError",
+    "EndpointConnectionError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "BadGateway",
+    "GatewayTimeout",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, service_name, retry_after):
+        super().__init__(f"{service_name} circuit is open; retry in {retry_after:.1f}s")
+        self.service_name = service_name
+        self.retry_after = retry_after
+
+
+def error_status_code(error):
+    """HTTP status carried by a requests, botocore or google-cloud exception, if any"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None and isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    return status
+
+
+def is_retryable_error(error):
+    """True for throttling, 5xx responses, timeouts and connection failures"""
+    if is_throttle_error(error):
+        return True
+    status = error_status_code(error)
+    if status is not None:
+        return status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return type(error).__name__ in TRANSIENT_EXCEPTION_NAMES
+
+
+def retry_after_seconds(error):
+    """Seconds from a Retry-After header on a throttled HTTP response, if present"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests so retries cannot amplify an outage.
+
+    Every request deposits `ratio` tokens and time deposits `min_per_second`;
+    each retry withdraws one token.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, extra=0.0):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second + extra)
+        self._updated = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self):
+        """Withdraw one retry token. Returns False when the budget is exhausted."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by attempts and a shared retry budget"""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, budget=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    def backoff(self, attempt, retry_after=None):
+        """Delay before retry number `attempt` (1-based); honours Retry-After when given"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def should_retry(self, error, attempt):
+        """True if a failed attempt may be retried (and spends a budget token if so)"""
+        return attempt < self.max_attempts and is_retryable_error(error) and self.budget.try_spend()
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated transient failures.
+
+    closed    -> calls flow; `failure_threshold` consecutive failures open the circuit
+    open      -> calls are refused with CircuitOpenError for `cooldown` seconds
+    half-open -> one probe call is let through; success closes the circuit,
+                 failure re-opens it with the cooldown doubled (up to max_cooldown)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, service_name, failure_threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.service_name = service_name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may be made now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.service_name, max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"{self.service_name} circuit closed; resuming calls")
+            self.state = self.CLOSED
+            self.cooldown = self.base_cooldown
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Count a transient failure, opening the circuit when the threshold is reached"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self._failures < self.failure_threshold or self.state == self.OPEN:
+                return
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            print(f"{self.service_name} circuit opened; pausing calls for {self.cooldown:.0f}s")
+
+    def retry_after(self):
+        """Seconds until the breaker will let a call through (0 when closed)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(self._opened_at + self.cooldown - time.monotonic(), 1.0)
+
+    def release_probe(self):
+        """Give up a half-open probe slot without a verdict (e.g. a non-transient error)"""
+        with self._lock:
+            self._probe_in_flight = False
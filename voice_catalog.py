@@ -0,0 +1,175 @@
+import os
+import json
+import argparse
+import threading
+from audio_io import atomic_output
+
+ELEVENLABS_VOICES_URL = "https://api.elevenlabs.io/v1/voices"
+
+# Language names accepted by select() and generate_speech(), mapped to the codes in voices.json
+LANGUAGE_CODES = {
+    "english": "en",
+    "hindi": "hi"
+}
+
+
+def language_code(language):
+    """Normalize "Hindi", "hi" or "hi-IN" to "hi" """
+    language = language.strip().lower()
+    return LANGUAGE_CODES.get(language, language.split("-")[0])
+
+
+def voice_languages(voice):
+    """Every language code a voice is labelled, fine-tuned or verified for"""
+    languages = set()
+    if (voice.get("labels") or {}).get("language"):
+        languages.add(language_code(voice["labels"]["language"]))
+    if (voice.get("fine_tuning") or {}).get("language"):
+        languages.add(language_code(voice["fine_tuning"]["language"]))
+    for verified in voice.get("verified_languages") or []:
+        if verified.get("language"):
+            languages.add(language_code(verified["language"]))
+    return languages
+
+
+def voice_models(voice):
+    """Model ids a voice is fine-tuned for or has a high quality base model for"""
+    models = set(voice.get("high_quality_base_model_ids") or [])
+    state = (voice.get("fine_tuning") or {}).get("state") or {}
+    models.update(model_id for model_id, status in state.items() if status == "fine_tuned")
+    return models
+
+
+class VoiceCatalog:
+    """In-memory index of an ElevenLabs voice list (the GET /v1/voices response).
+
+    Voices are indexed by voice_id, lowercased name, language code, label
+    (e.g. ("accent", "indian")) and supported model, so lookups never scan
+    the list and never touch the network.
+    """
+
+    def __init__(self, voices):
+        self.voices = list(voices)
+        self.by_id = {}
+        self.by_name = {}
+        self.by_language = {}
+        self.by_label = {}
+        self.by_model = {}
+        for voice in self.voices:
+            self.by_id[voice["voice_id"]] = voice
+            self.by_name.setdefault(voice.get("name", "").strip().lower(), voice)
+            for code in voice_languages(voice):
+                self.by_language.setdefault(code, []).append(voice)
+            for key, value in (voice.get("labels") or {}).items():
+                if isinstance(value, str):
+                    self.by_label.setdefault((key, value.lower()), []).append(voice)
+            for model_id in voice_models(voice):
+                self.by_model.setdefault(model_id, []).append(voice)
+        self._position = {voice["voice_id"]: k for k, voice in enumerate(self.voices)}
+        # Voice ids per index entry, for intersecting filters in matching()
+        self._language_ids = {k: {v["voice_id"] for v in vs} for k, vs in self.by_language.items()}
+        self._label_ids = {k: {v["voice_id"] for v in vs} for k, vs in self.by_label.items()}
+        self._model_ids = {k: {v["voice_id"] for v in vs} for k, vs in self.by_model.items()}
+
+    def __len__(self):
+        return len(self.voices)
+
+    def get(self, voice_id):
+        return self.by_id.get(voice_id)
+
+    def find_by_name(self, name):
+        return self.by_name.get(name.strip().lower())
+
+    def with_language(self, language):
+        return self.by_language.get(language_code(language), [])
+
+    def with_label(self, key, value):
+        return self.by_label.get((key, value.lower()), [])
+
+    def supporting_model(self, model_id):
+        return self.by_model.get(model_id, [])
+
+    def supports_model(self, voice_id, model_id):
+        return voice_id in self._model_ids.get(model_id, ())
+
+    def matching(self, language=None, model_id=None, **labels):
+        """Voices (in catalog order) matching every given filter.
+
+        e.g. matching(language="Hindi", model_id="eleven_turbo_v2_5", gender="female")
+        """
+        filters = []
+        if language:
+            filters.append(self._language_ids.get(language_code(language), set()))
+        if model_id:
+            filters.append(self._model_ids.get(model_id, set()))
+        for key, value in labels.items():
+            filters.append(self._label_ids.get((key, value.lower()), set()))
+        if not filters:
+            return list(self.voices)
+        candidates = set.intersection(*sorted(filters, key=len))
+        return [self.by_id[voice_id] for voice_id in sorted(candidates, key=self._position.get)]
+
+    def select(self, language=None, model_id=None, **labels):
+        """First voice matching every given filter, or None"""
+        voices = self.matching(language, model_id, **labels)
+        return voices[0] if voices else None
+
+
+def fetch_voices(api_key):
+    """Download the current voice list from ElevenLabs"""
+    from tts_clients import get_http_session
+
+    response = get_http_session("elevenlabs").get(ELEVENLABS_VOICES_URL, headers={"xi-api-key": api_key})
+    response.raise_for_status()
+    return response.json().get("voices", [])
+
+
+def save_voices(voices, path="voices.json"):
+    """Atomically replace the voices.json dump, in the same indented layout as the tracked file"""
+    with atomic_output(path) as f:
+        f.write(json.dumps(voices, indent=2).encode("utf-8"))
+
+
+def load_voices(path="voices.json"):
+    with open(path, "r", encoding="utf-8") as f:
+        voices = json.load(f)
+    # Accept both a bare list and the raw API response
+    return voices.get("voices", []) if isinstance(voices, dict) else voices
+
+
+# Process-wide catalog, reused until voices.json changes
+_catalog = {"catalog": None, "path": None, "mtime": None}
+_lock = threading.Lock()
+
+
+def get_voice_catalog(path="voices.json"):
+    """Return the shared VoiceCatalog for path, rebuilt only when the file changes on disk.
+
+    Never touches the network; refresh the file with `--refresh` instead.
+    """
+    with _lock:
+        mtime = os.path.getmtime(path)
+        if _catalog["catalog"] is None or _catalog["path"] != path or _catalog["mtime"] != mtime:
+            _catalog.update({"catalog": VoiceCatalog(load_voices(path)), "path": path, "mtime": mtime})
+        return _catalog["catalog"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query (or refresh) the ElevenLabs voice catalog in voices.json')
+    parser.add_argument('--voices-file', type=str, default='voices.json', help='Voice list dump')
+    parser.add_argument('--refresh', action='store_true', help='Download the current voice list first (needs ELEVENLABS_API_KEY)')
+    parser.add_argument('--language', type=str, help='Language name or code, e.g. Hindi or hi')
+    parser.add_argument('--model', type=str, help='Model id the voice must support, e.g. eleven_turbo_v2_5')
+    parser.add_argument('--label', nargs='*', metavar='KEY=VALUE', help='Label filters, e.g. accent=indian gender=female')
+
+    args = parser.parse_args()
+    if args.refresh:
+        from dotenv import load_dotenv
+        load_dotenv()
+        save_voices(fetch_voices(os.getenv("ELEVENLABS_API_KEY")), args.voices_file)
+    catalog = get_voice_catalog(args.voices_file)
+    labels = dict(value.split("=", 1) for value in args.label or [])
+    voices = catalog.matching(args.language, args.model, **labels)
+    for voice in voices:
+        print(f"{voice['voice_id']}  {voice.get('name', '')}")
+    print(f"{len(voices)} of {len(catalog)} voices")